@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## bench_records.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+from __future__ import print_function
+import getopt
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+import statutil
+
+
+#
+#==============================================================================
+def generate(path, solvers, insts):
+    """
+        Writes the files of random solvers on the same instances, with a
+        numeric key, a key with units and a few strings.
+    """
+
+    random.seed(1)
+    base = [random.lognormvariate(3, 2) for i in range(insts)]
+
+    files = []
+    for s in range(solvers):
+        stats = {}
+        for i in range(insts):
+            t = round(base[i] * random.uniform(0.7, 1.3), 4)
+            solved = t < 1000 and random.random() > 0.05
+            stats['inst{0:06d}'.format(i)] = {'status': solved, 'rtime': t if solved else 1000.0,
+                    'mempeak': '{0} KiB'.format(random.randint(1000, 900000)),
+                    'family': 'family{0}'.format(i % 4), 'log': 'x' * 50}
+
+        files.append(os.path.join(path, 'solver{0:02d}.json'.format(s)))
+        with open(files[-1], 'w') as fp:
+            json.dump({'preamble': {'program': 'solver{0:02d}'.format(s), 'prog_args': '',
+                'benchmark': 'bench'}, 'stats': stats}, fp, indent=1)
+
+    return files
+
+
+#
+#==============================================================================
+def with_dicts(files, options):
+    """
+        Loads the files and makes the data of a cactus plot with a VBS
+        the way StatArray did it on dictionary records.
+    """
+
+    stats = []
+    for f in files:
+        with open(f, 'r') as fp:
+            data = json.load(fp)['stats']
+        stats.append((data, sorted(list(set(data.keys())))))
+
+    inst_set = set()
+    for data, insts in stats:
+        inst_set = inst_set.union(set(insts))
+
+    # the VBS takes the record with the minimal value among solved ones
+    vbs = {}
+    for inst in sorted(list(inst_set)):
+        alts = []
+        for data, insts in stats:
+            if inst in data and data[inst]['status'] == True:
+                alts.append(data[inst])
+
+        if alts:
+            vbs[inst] = min(alts, key=lambda x: x[options['key']] if options['key'] in x else float('inf'))
+        else:
+            vbs[inst] = [data for data, insts in stats if inst in data][0][inst]
+    stats.append((vbs, sorted(vbs)))
+
+    result = []
+    for data, insts in stats:
+        vals, num_solved, last_val = [], 0, -1
+        for inst in insts:
+            val = data[inst][options['key']] if options['key'] in data[inst] else 1e9
+            if data[inst]['status'] == True:
+                if val > last_val:
+                    last_val = val
+                if val >= float(options['timeout']):
+                    val = 1e9
+                elif val <= 0.000000001:
+                    val = 0.000000001
+                num_solved += 1
+            else:
+                val = 1e9
+            vals.append(val)
+        result.append((sorted(vals), num_solved, last_val))
+
+    return result
+
+
+#
+#==============================================================================
+def with_store(files, options):
+    """
+        Does the same with StatArray and its record stores.
+    """
+
+    stats = statutil.StatArray('program', files)
+    stats.make_vbs('vbs', 'all', options['key'])
+
+    return [(list(v), s, l) for n, v, s, l in stats.get_data(options, 0.000000001, 1e9, sort=True)]
+
+
+#
+#==============================================================================
+def check(solvers, insts, runs):
+    """
+        Times both ways on the generated files. Returns the list of
+        failures: different results or the record stores being slower.
+    """
+
+    path = tempfile.mkdtemp()
+    try:
+        files = generate(path, solvers, insts)
+        options = {'key': 'rtime', 'timeout': 1000}
+
+        best = {}
+        for i in range(runs):
+            for way in (with_dicts, with_store):
+                start = time.time()
+                result = way(files, options)
+                spent = time.time() - start
+
+                best[way] = spent if way not in best else min(best[way], spent)
+                if way is with_dicts:
+                    expected = result
+    finally:
+        shutil.rmtree(path)
+
+    print('{0} files of {1} instances (best of {2}):'.format(solvers, insts, runs))
+    print('    dictionary records: {0:.3f} s'.format(best[with_dicts]))
+    print('    record stores:      {0:.3f} s'.format(best[with_store]))
+
+    failures = []
+    if result != expected:
+        failures.append('record stores give different data')
+    if best[with_store] > best[with_dicts]:
+        failures.append('record stores are slower than dictionary records')
+
+    return failures
+
+
+#
+#==============================================================================
+def usage():
+    """
+        Prints usage message.
+    """
+
+    print('Usage:', os.path.basename(sys.argv[0]), '[options]')
+    print('Checks that loading files into record stores and plotting them is no slower than with dictionary records.')
+    print('Options:')
+    print('        -f, --files=<int>               Number of generated files (default = 8)')
+    print('        -h, --help                      Show this message')
+    print('        -i, --insts=<int>               Number of instances in each file (default = 20000)')
+    print('        -r, --runs=<int>                Number of runs, the best one is timed (default = 5)')
+
+
+#
+#==============================================================================
+if __name__ == '__main__':
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'f:hi:r:', ['files=', 'help', 'insts=', 'runs='])
+    except getopt.GetoptError as err:
+        sys.stderr.write(str(err).capitalize() + '\n')
+        usage()
+        sys.exit(1)
+
+    solvers, insts, runs = 8, 20000, 5
+    for opt, arg in opts:
+        if opt in ('-f', '--files'):
+            solvers = int(arg)
+        elif opt in ('-h', '--help'):
+            usage()
+            sys.exit(0)
+        elif opt in ('-i', '--insts'):
+            insts = int(arg)
+        elif opt in ('-r', '--runs'):
+            runs = int(arg)
+
+    failures = check(solvers, insts, runs)
+    for failure in failures:
+        sys.stderr.write('\033[31;1mFailed:\033[m {0}\n'.format(failure))
+
+    sys.exit(1 if failures else 0)
@@ -10,7 +10,10 @@
 
 #
 #==============================================================================
-import json
+from fileutil import read_defaults
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from matplotlib.lines import Line2D
 import matplotlib.pyplot as plt
 from matplotlib import __version__ as mpl_version
 import math
@@ -34,35 +37,64 @@ class Cactus(Plot, object):
 
         super(Cactus, self).__init__(options)
 
-        with open(self.def_path, 'r') as fp:
-            self.linestyles = json.load(fp)['cactus_linestyle']
+        self.linestyles = read_defaults(self.def_path)['cactus_linestyle']
+        self.max_points = options['max_points']
+        self.collection = options['line_collection']
+        self.highlight = options['highlight']
+        self.lgd_max = options['lgd_max']
 
     def create(self, data):
         """
             Does the plotting.
         """
 
+        x_max = self.x_max if self.x_max else math.ceil(max([d[2] for d in data]) / float(100)) * 100
+
         # making lines
         coords = []
         for d in data:
-            coords.append(np.arange(1, len(d[1]) + 1))  # xs (separate for each line)
-            coords.append(np.array(sorted(d[1])))
-        lines = plt.plot(*coords, zorder=3)
-
-        # setting line styles
-        for i, l in enumerate(lines):
-            plt.setp(l, **self.linestyles[i % len(self.linestyles)])
-        # manually setting markevery parameter
-        if self.markevery > -1:
-          for i, l in enumerate(lines):
-            plt.setp(l, markevery=self.markevery)
+            vals = np.asarray(d[1])
+            if np.any(vals[1:] < vals[:-1]):  # may come already sorted
+                vals = np.sort(vals)
+
+            xs = np.arange(1, len(vals) + 1)  # xs (separate for each line)
+            if self.max_points and len(vals) > self.max_points:
+                keep = decimate(vals, self.max_points, self.x_min, x_max, self.x_log)
+                xs, vals = xs[keep], vals[keep]
+
+            coords.append(xs)
+            coords.append(vals)
+
+        # line styles; all but the first self.highlight lines are faded
+        styles = []
+        for i in range(len(data)):
+            style = dict(self.linestyles[i % len(self.linestyles)])
+            if self.highlight and i >= self.highlight:
+                style.update(alpha=style.get('alpha', 1.0) * 0.3, lw=min(style.get('lw', 1.0), 1.0), marker='')
+            styles.append(style)
+
+        if self.collection:
+            lines = self.draw_collection(coords[0::2], coords[1::2], styles)
+        else:
+            lines = plt.plot(*coords, zorder=3)
+            self.layers.extend(lines)
+
+            # setting line styles
+            for i, l in enumerate(lines):
+                plt.setp(l, **styles[i])
+                if self.highlight and i < self.highlight:
+                    plt.setp(l, zorder=4)
+            # manually setting markevery parameter
+            if self.markevery > -1:
+              for i, l in enumerate(lines):
+                plt.setp(l, markevery=self.markevery)
 
         # turning the grid on
         if not self.no_grid:
             plt.grid(True, color=self.grid_color, ls=self.grid_style, lw=self.grid_width, zorder=1)
 
         # axes limits
-        plt.xlim(self.x_min, self.x_max if self.x_max else math.ceil(max([d[2] for d in data]) / float(100)) * 100)
+        plt.xlim(self.x_min, x_max)
         plt.ylim(self.y_min, self.y_max if self.y_max else self.timeout)
 
         # axes labels
@@ -104,6 +136,8 @@ class Cactus(Plot, object):
         # making the legend
         if self.lgd_loc != 'off':
             lgtext = [d[0] for d in data]
+            if self.lgd_max:
+                lines, lgtext = lines[:self.lgd_max], lgtext[:self.lgd_max]
             lg = ax.legend(lines, lgtext, ncol=self.lgd_ncol, loc=self.lgd_loc, fancybox=self.lgd_fancy, shadow=self.lgd_shadow if self.lgd_alpha == 1.0 else False)
             fr = lg.get_frame()
             fr.set_lw(1)
@@ -114,4 +148,67 @@ class Cactus(Plot, object):
         for i in six.itervalues(ax.spines):
             i.set_linewidth(1)
 
-        plt.savefig(self.save_to, bbox_inches='tight', transparent=self.transparent)
+        self.save(sum(len(xs) for xs in coords[0::2]))
+
+    def draw_collection(self, xs, ys, styles):
+        """
+            Draws all the lines as a single LineCollection, each with the
+            color, line style and width of its style (markers are not
+            drawn). Highlighted lines are drawn last, i.e. on top. Returns
+            lines usable as legend handles, which are not drawn.
+        """
+
+        colors = [to_rgba(s.get('c', s.get('color', 'black')), s.get('alpha')) for s in styles]
+        widths = [s.get('lw', s.get('linewidth', 1.0)) for s in styles]
+        dashes = [s.get('ls', s.get('linestyle', '-')) for s in styles]
+
+        order = list(range(len(styles)))
+        if self.highlight:
+            order = order[self.highlight:] + order[:self.highlight]
+
+        self.layers.append(LineCollection([np.column_stack((xs[i], ys[i])) for i in order],
+            colors=[colors[i] for i in order], linewidths=[widths[i] for i in order],
+            linestyles=[dashes[i] for i in order], zorder=3))
+        plt.gca().add_collection(self.layers[-1])
+
+        return [Line2D([], [], color=c, lw=w, ls=d) for c, w, d in zip(colors, widths, dashes)]
+
+
+#
+#==============================================================================
+def decimate(vals, max_points, x_min, x_max, x_log=False):
+    """
+        Chooses at most max_points (but at least 8) points of a sorted line
+        to draw. The X axis, from x_min to x_max, is split into buckets of
+        the same width (on a logarithmic axis, of the same ratio), and the
+        first and the last point of each bucket are kept. As the line is
+        monotone, it stays within the box of each bucket, so every point of
+        the exact line is within one bucket width, i.e. about 2 / max_points
+        of the X axis, of the line drawn, on linear and logarithmic Y axes
+        alike. The endpoints are kept, and so is the step to the final
+        plateau of the line (the unsolved instances), so the number of
+        solved instances shows exactly. Points outside the axis get buckets
+        of their own. Returns the indices of the points kept (all of them
+        if the axis is empty, e.g. when no instance is solved).
+    """
+
+    if x_max <= 0:
+        return np.arange(len(vals))
+
+    buckets = max(1, max_points // 2 - 3)
+
+    xs = np.arange(1, len(vals) + 1, dtype=np.float64)
+    if x_log:
+        lo = math.log(x_min) if x_min > 0 else 0.0
+        pos = (np.log(xs) - lo) / max(math.log(x_max) - lo, 1e-9)
+    else:
+        pos = (xs - x_min) / max(x_max - x_min, 1e-9)
+
+    ids = np.clip(np.floor(pos * buckets), -1, buckets).astype(np.intp)
+    ids[pos == 1] = buckets - 1  # the point at x_max is on the axis
+
+    # the final plateau is a bucket of its own
+    ids[np.searchsorted(vals, vals[-1]):] = buckets + 1
+
+    change = np.flatnonzero(ids[1:] != ids[:-1])
+    return np.unique(np.concatenate(([0, len(vals) - 1], change, change + 1)))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## check_startup.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+from __future__ import print_function
+import getopt
+import os
+import subprocess
+import sys
+import time
+
+
+#
+#==============================================================================
+# runs mkplot.py in the child process and lists the modules it has loaded
+probe = '''
+import runpy, sys
+sys.argv = sys.argv[1:]
+sys.path.insert(0, __import__('os').path.dirname(sys.argv[0]))
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+except SystemExit:
+    pass
+sys.stderr.write('\\nmodules: ' + ' '.join(sorted(sys.modules)) + '\\n')
+'''
+
+# modules a dry run must not load
+heavy = ['matplotlib', 'http.server', 'socketserver']
+
+
+#
+#==============================================================================
+def check(max_time, runs):
+    """
+        Makes dry runs of mkplot.py on the example files. Returns the list
+        of failures: heavy modules loaded or the best wall time exceeding
+        max_time seconds.
+    """
+
+    root = os.path.dirname(os.path.realpath(__file__))
+    args = [sys.executable, '-c', probe, os.path.join(root, 'mkplot.py'), '--dry-run',
+            os.path.join(root, 'examples', 'solver1.json'), os.path.join(root, 'examples', 'solver2.json')]
+
+    best, failures = None, []
+    for i in range(runs):
+        start = time.time()
+        proc = subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+        spent = time.time() - start
+
+        if proc.returncode != 0 or 'modules: ' not in proc.stderr:
+            return ['dry run failed:\n' + proc.stderr]
+
+        best = spent if best is None else min(best, spent)
+
+    loaded = set(proc.stderr.rsplit('modules: ', 1)[1].split())
+    failures.extend('{0} is imported by a dry run'.format(m) for m in heavy if m in loaded)
+
+    print('dry run: {0:.3f} s (best of {1}, bound {2:.3f} s)'.format(best, runs, max_time))
+    if best > max_time:
+        failures.append('dry run takes {0:.3f} s, more than {1:.3f} s'.format(best, max_time))
+
+    return failures
+
+
+#
+#==============================================================================
+def usage():
+    """
+        Prints usage message.
+    """
+
+    print('Usage:', os.path.basename(sys.argv[0]), '[options]')
+    print('Checks that a dry run of mkplot.py starts quickly and imports neither matplotlib nor the server.')
+    print('Options:')
+    print('        -h, --help                      Show this message')
+    print('        -r, --runs=<int>                Number of dry runs, the best one is timed (default = 3)')
+    print('        -t, --max-time=<float>          Maximal wall time of a dry run in seconds (default = 0.5)')
+
+
+#
+#==============================================================================
+if __name__ == '__main__':
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'hr:t:', ['help', 'runs=', 'max-time='])
+    except getopt.GetoptError as err:
+        sys.stderr.write(str(err).capitalize() + '\n')
+        usage()
+        sys.exit(1)
+
+    max_time, runs = 0.5, 3
+    for opt, arg in opts:
+        if opt in ('-h', '--help'):
+            usage()
+            sys.exit(0)
+        elif opt in ('-r', '--runs'):
+            runs = int(arg)
+        elif opt in ('-t', '--max-time'):
+            max_time = float(arg)
+
+    failures = check(max_time, runs)
+    for failure in failures:
+        sys.stderr.write('\033[31;1mFailed:\033[m {0}\n'.format(failure))
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## check_units.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+from __future__ import print_function
+import getopt
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+import units
+
+
+#
+#==============================================================================
+# (key, column of strings, expected values or None); the columns of a key
+# are parsed in turn, so that the later ones take the detected unit path
+cases = [
+    ('mem', ['1 KiB', '2048 KiB'], [1.0 / 1024, 2.0]),
+    ('mem', ['3 KiB', '1 MiB'], [3.0 / 1024, 1.0]),
+    ('mem', ['1 KiB\n2 KiB', ''], None),
+    ('mem', ['1 KiB', '2 KiB\n'], None),
+    ('time', ['1.5 s', '20 s'], [1.5, 20.0]),
+    ('time', ['2 s', '300ms'], [2.0, 0.3]),
+    ('time', ['1 s\n2 s', ''], None),
+    ('time', ['1 s', 'nan s'], None),
+    ('time', ['1 s', '1e s'], None),
+    ('time', ['1 s', '1 KiB'], None),
+    ('name', ['abc', 'd'], None)
+]
+
+
+#
+#==============================================================================
+def check():
+    """
+        Parses the columns of the cases. Returns the list of failures.
+    """
+
+    failures = []
+    for key, strs, expected in cases:
+        vals = units.parse(key, strs)
+        if vals is not None:
+            vals = vals.tolist()
+
+        if expected is None and vals is None:
+            continue
+        elif expected is None or vals is None or len(vals) != len(expected) or \
+                any(abs(v - e) > 1e-9 * abs(e) for v, e in zip(vals, expected)):
+            failures.append('parse({0!r}, {1!r}) gives {2}, not {3}'.format(key, strs, vals, expected))
+
+    print('units: {0} cases, {1} failed'.format(len(cases), len(failures)))
+
+    return failures
+
+
+#
+#==============================================================================
+def usage():
+    """
+        Prints usage message.
+    """
+
+    print('Usage:', os.path.basename(sys.argv[0]), '[options]')
+    print('Checks the parsing of columns of numbers with units.')
+    print('Options:')
+    print('        -h, --help                      Show this message')
+
+
+#
+#==============================================================================
+if __name__ == '__main__':
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'h', ['help'])
+    except getopt.GetoptError as err:
+        sys.stderr.write(str(err).capitalize() + '\n')
+        usage()
+        sys.exit(1)
+
+    for opt, arg in opts:
+        if opt in ('-h', '--help'):
+            usage()
+            sys.exit(0)
+
+    failures = check()
+    for failure in failures:
+        sys.stderr.write('\033[31;1mFailed:\033[m {0}\n'.format(failure))
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## csvutil.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+import csv
+import fileutil
+import numpy as np
+
+
+#
+#==============================================================================
+class CSVException(Exception):
+    pass
+
+
+#
+#==============================================================================
+class CSVTable(object):
+    """
+        Table of values read from a CSV file. The first row contains the
+        names of the tools and the first column contains the names of the
+        instances. The values are kept in a float64 matrix of shape
+        (instances, tools), where NaN means a missing value.
+    """
+
+    def __init__(self, filename=None, delimiter=' ', chunk_size=1 << 22):
+        """
+            Constructor.
+        """
+
+        self.names = []
+        self.insts = []
+        self.vals = np.zeros((0, 0))
+
+        if filename:
+            self.read(filename, delimiter, chunk_size)
+
+    def read(self, filename, delimiter=' ', chunk_size=1 << 22):
+        """
+            Reads the file in chunks of about chunk_size characters, each
+            converted into a float64 block at once. With the (default) space
+            delimiter, runs of delimiters are treated as one; with any other
+            delimiter, an empty cell is a missing value.
+        """
+
+        with fileutil.open_file(filename, newline='') as fp:
+            header = fp.readline()
+            if not header.strip():
+                raise CSVException('Empty CSV file \'{0}\''.format(filename))
+
+            header = list(csv.reader([header], delimiter=delimiter, quotechar='|'))[0]
+            self.names = [n.strip() for n in header[1:] if n.strip() or delimiter != ' ']
+            width = len(self.names) + 1
+
+            self.insts, blocks = [], []
+            while True:
+                text = fp.read(chunk_size)
+                if not text:
+                    break
+                text += fp.readline()  # completing the last line
+
+                names, cells = split_rows(text, delimiter, width, filename)
+                self.insts.extend(name.strip() for name in names)
+
+                try:
+                    vals = list(map(float, cells))
+                except ValueError:
+                    vals = [to_float(v, filename) for v in cells]
+
+                blocks.append(np.array(vals, dtype=np.float64).reshape(len(names), width - 1))
+
+        self.vals = np.concatenate(blocks) if blocks else np.zeros((0, width - 1))
+
+
+#
+#==============================================================================
+def split_rows(text, delimiter, width, filename):
+    """
+        Splits a chunk of text into the names of instances and the flat
+        list of cells of their rows. If all the rows have the same number
+        of cells, the whole chunk is split at once. The csv module is used
+        only if the chunk has quoted cells or, with the space delimiter,
+        tabulations (they are not delimiters but str.split() would take
+        them as such).
+    """
+
+    lines = text.splitlines()
+
+    if '|' in text or (delimiter == ' ' and '\t' in text):
+        rows = csv.reader(lines, delimiter=delimiter, quotechar='|')
+        if delimiter == ' ':
+            rows = [[v for v in row if v.strip()] for row in rows]
+    elif delimiter == ' ':
+        if set(map(len, map(str.split, lines))) <= set([0, width]):
+            cells = text.split()
+            names = cells[::width]
+            del cells[::width]
+            return names, cells
+
+        rows = [line.split() for line in lines]
+    else:
+        lines = [line for line in lines if line.strip()]
+        if set(line.count(delimiter) for line in lines) <= set([width - 1]):
+            cells = delimiter.join(lines).split(delimiter)
+            names = cells[::width]
+            del cells[::width]
+            return names, cells
+
+        rows = [line.split(delimiter) for line in lines]
+
+    # rows of various lengths
+    names, cells = [], []
+    for row in rows:
+        if len(row) < 2 and not ''.join(row).strip():
+            continue
+        elif len(row) > width:
+            raise CSVException('Instance \'{0}\' in \'{1}\' has {2} values while there are {3} tools'.format(row[0].strip(), filename, len(row) - 1, width - 1))
+
+        names.append(row[0])
+        cells.extend(row[1:])
+        cells.extend([''] * (width - len(row)))
+
+    return names, cells
+
+
+#
+#==============================================================================
+def to_float(val, filename):
+    """
+        Converts a cell into a float; an empty cell is a missing value.
+    """
+
+    if not val.strip():
+        return float('nan')
+
+    try:
+        return float(val)
+    except ValueError:
+        raise CSVException('Non-numeric value \'{0}\' in \'{1}\''.format(val.strip(), filename))
+
+
+#
+#==============================================================================
+def sniff(filename):
+    """
+        Guesses the format of a file by its first non-blank character:
+        STAT files are JSON objects, anything else is considered a CSV
+        table.
+    """
+
+    try:
+        with fileutil.open_file(filename, newline='') as fp:
+            head = fp.read(4096).lstrip('\ufeff \t\r\n')
+    except (IOError, OSError, UnicodeDecodeError):
+        return 'json'  # let the STAT reader report the error
+
+    return 'json' if not head or head[0] == '{' else 'csv'
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## fileutil.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+import bz2
+import gzip
+import io
+import json
+import lzma
+
+try:  # zstd is optional
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+#
+#==============================================================================
+magics = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'BZh', 'bzip2'),
+    (b'\x28\xb5\x2f\xfd', 'zstd')
+]
+
+_defaults = {}
+
+
+#
+#==============================================================================
+def compression(filename):
+    """
+        Detects the compression of a file by its magic bytes. Returns None
+        for an uncompressed file.
+    """
+
+    with open(filename, 'rb') as fp:
+        head = fp.read(6)
+
+    for magic, name in magics:
+        if head.startswith(magic):
+            return name
+
+    return None
+
+
+#
+#==============================================================================
+def open_file(filename, newline=None):
+    """
+        Opens a (possibly compressed) file for reading text. Compressed
+        files are decompressed on the fly while being read.
+    """
+
+    comp = compression(filename)
+
+    if comp == 'gzip':
+        return gzip.open(filename, 'rt', newline=newline)
+    elif comp == 'xz':
+        return lzma.open(filename, 'rt', newline=newline)
+    elif comp == 'bzip2':
+        return bz2.open(filename, 'rt', newline=newline)
+    elif comp == 'zstd':
+        if zstandard is None:
+            raise IOError('\'{0}\' is zstd-compressed but the zstandard module is not installed'.format(filename))
+
+        reader = zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb'))
+        return io.TextIOWrapper(reader, newline=newline)
+
+    return open(filename, 'r', newline=newline)
+
+
+#
+#==============================================================================
+def read_defaults(def_path):
+    """
+        Reads a file of default settings and styles. Each file is parsed
+        once per process; the result is not to be modified.
+    """
+
+    if def_path not in _defaults:
+        with open(def_path, 'r') as fp:
+            _defaults[def_path] = json.load(fp)
+
+    return _defaults[def_path]
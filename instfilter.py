@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## instfilter.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+import numpy as np
+import re
+import six
+
+
+#
+#==============================================================================
+class FilterException(Exception):
+    pass
+
+
+#
+#==============================================================================
+class InstFilter(object):
+    """
+        Instance filter given as a dictionary of conditions on the keys of
+        instance records, which all have to hold. A condition is either a
+        value (equality), a list of values (membership) or a dictionary of
+        operators (a dictionary with other keys is a value):
+
+            {"size": {">=": 3, "<": 10}}         range (numbers only)
+            {"family": {"!=": "crypto"}}         inequality
+            {"family": {"in": ["bmc", "fmc"]}}   membership
+            {"@instance": {"re": "^sat-"}}       regex search
+            {"family": {"not": ["bmc", "fmc"]}}  negation of a condition
+
+        A dictionary whose keys are all operators is taken as operators;
+        to test the equality with such a value, use {"==": value}. The key
+        "@instance" stands for the name of an instance (ranges do not apply
+        to it). A record without the key does not satisfy any condition on
+        it, negated or not.
+
+        The filter is compiled once and evaluated over a StatColumns
+        object: equality and membership are tested on integer codes of the
+        values and regular expressions are run once per distinct value, so
+        the work is shared by all the Stat objects.
+    """
+
+    ranges = {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal}
+    operators = frozenset(['==', 'in', '!=', 're', 'not']).union(ranges)
+
+    def __init__(self, filters):
+        """
+            Constructor. Compiles the filters into a list of (key, test,
+            negate) conditions.
+        """
+
+        self.conds = []
+
+        for key, spec in six.iteritems(filters):
+            self.conds.extend(self.compile(key, spec, False))
+
+    def compile(self, key, spec, negate):
+        """
+            Compiles the condition on a key.
+        """
+
+        if not isinstance(spec, dict) or not spec or not self.operators.issuperset(spec):
+            return [(key, ('in', spec if isinstance(spec, list) else [spec]), negate)]
+
+        conds = []
+        for op, arg in six.iteritems(spec):
+            if op in ('==', 'in'):
+                conds.append((key, ('in', arg if isinstance(arg, list) and op == 'in' else [arg]), negate))
+            elif op == '!=':
+                conds.append((key, ('in', [arg]), not negate))
+            elif op in self.ranges:
+                if key == '@instance':
+                    raise FilterException('Operator \'{0}\' is not supported for key \'@instance\''.format(op))
+                if type(arg) not in (int, float):
+                    raise FilterException('Operator \'{0}\' of key \'{1}\' needs a number'.format(op, key))
+                conds.append((key, (op, arg), negate))
+            elif op == 're':
+                try:
+                    conds.append((key, ('re', re.compile(arg)), negate))
+                except (re.error, TypeError) as e:
+                    raise FilterException('Bad regular expression for key \'{0}\': {1}'.format(key, e))
+            elif op == 'not':
+                conds.extend(self.compile(key, arg, not negate))
+
+        return conds
+
+    def keys(self):
+        """
+            Instance keys used by the filter.
+        """
+
+        return sorted(set(cond[0] for cond in self.conds if cond[0] != '@instance'))
+
+    def mask(self, cols):
+        """
+            Evaluates the filter: returns a boolean matrix telling which
+            instances of which Stat objects are kept.
+        """
+
+        mask = cols.has.copy()
+
+        for key, (op, arg), negate in self.conds:
+            if key == '@instance':
+                # the same for all the Stat objects
+                res = np.array([op == 're' and arg.search(inst) is not None or op == 'in' and inst in arg
+                    for inst in cols.insts], dtype=bool)[:, None]
+                present = True
+            elif op in self.ranges:
+                vals = cols.values(key)
+                present = ~np.isnan(vals)
+                with np.errstate(invalid='ignore'):
+                    res = self.ranges[op](vals, arg)
+            else:
+                codes, index = cols.codes(key)
+                present = codes >= 0
+
+                if op == 'in':
+                    match = [index[v] for v in map(hashable, arg) if v in index]
+                else:
+                    match = [c for v, c in six.iteritems(index) if isinstance(v, six.string_types) and arg.search(v)]
+                res = np.isin(codes, match)
+
+            mask &= present & (~res if negate else res)
+
+        return mask
+
+
+#
+#==============================================================================
+def hashable(val):
+    """
+        Makes a value usable as a dictionary key; lists and dictionaries are
+        replaced by their JSON representation (tagged to differ from any
+        string).
+    """
+
+    if isinstance(val, (list, dict)):
+        return ('json', repr(val))
+
+    return val
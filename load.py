@@ -10,8 +10,13 @@
 
 #
 #==============================================================================
-import csv
+import collections
+import csvutil
+import instfilter
 import json
+import numpy as np
+import portfolio
+import statcache
 import statutil
 import six
 import sys
@@ -21,30 +26,109 @@ import sys
 #==============================================================================
 def load_data(files, options):
     """
-        Loads data from the input files.
+        Loads data from the input files. If several keys are given, the
+        files are read once and an ordered dictionary mapping each key to
+        its data is returned.
     """
 
+    return process_data(read_data(files, options), options)
+
+
+#
+#==============================================================================
+def read_data(files, options, keys=None):
+    """
+        Reads the input files into a CSVTable or a StatArray. When
+        streaming, the instance keys kept are the given ones or, by
+        default, those needed for options.
+    """
+
+    if options['stream'] and keys is None:
+        keys = stream_keys(options)
+    elif not options['stream']:
+        keys = None
+
+    cache = None
+    if options['cache']:
+        cache = statcache.StatCache(options['cache'], options['cache_size'])
+
+    if csvutil.sniff(files[0]) == 'csv':
+        # expecting exactly one input file
+        return csvutil.CSVTable(files[0], options['csv_delim'])
+
     try:  # if JSON data
-        return load_json(statutil.StatArray(options['legend'], files), options)
+        if options['only']:
+            files = select_files(files, options)
+
+        return statutil.StatArray(options['legend'], files, options['jobs'], keys, cache)
     except statutil.JSONException as e:
         sys.stderr.write('\033[33;1mWarning:\033[m ' + str(e) + '\033[m\n')
         sys.stderr.write('Probably not a JSON format. Trying to read as CSV.\n')
 
         # reading CSV
         # expecting exactly one input file
-        with open(files[0], 'r') as fp:
-            # try:
-            rows = csv.reader(fp, delimiter=' ', quotechar='|')
-            rows = [row for row in rows]
+        return csvutil.CSVTable(files[0], options['csv_delim'])
+
+
+#
+#==============================================================================
+def stream_keys(options):
+    """
+        Instance keys needed for options.
+    """
+
+    keys = list(options['keys'])
+    if options['filter']:
+        keys.extend(instfilter.InstFilter(options['filter']).keys())
+
+    return keys
+
 
-            stats = []
-            names = [n.strip() for n in rows[0][1:] if n.strip()]
-            for row in rows[1:]:
-                stats.append([val.strip() for val in row[1:] if val.strip()])
+#
+#==============================================================================
+def process_data(raw, options, copy=False):
+    """
+        Computes the data to plot from what read_data() returned. A
+        StatArray is modified in place unless copy is True.
+    """
+
+    if isinstance(raw, csvutil.CSVTable):
+        return load_csv(raw, options)
+
+    return load_json(raw.copy() if copy else raw, options)
+
+
+#
+#==============================================================================
+def select_files(files, options):
+    """
+        Reads only the preambles of the files and keeps the files of the
+        tools that are to be shown with --only or are used by a VBS or a
+        ratio. The stats of the other files are never parsed.
+    """
+
+    if options['portfolio']:
+        return files
+
+    needed = set(options['only'])
+    for tools in list((options['vbs'] or {}).values()) + list((options['ratio'] or {}).values()):
+        if tools == 'all':
+            return files
+        needed.update(tools)
+
+    preambles = [statutil.read_preamble(f) for f in files]
+    labels = [statutil.make_label(p, options['legend']) for p in preambles]
+
+    # a cluster of files is labelled after its first file
+    if options['join_key']:
+        use_key = options['join_key'] if type(options['join_key']) is list else [options['join_key']]
 
-            return load_csv(names, stats, options)
-            # except:
-            #     sys.stderr.write('\033[31;1mError:\033[m Unable to read input file(s).\n')
+        firsts = {}
+        for i, preamble in enumerate(preambles):
+            key = ' '.join([preamble[k] for k in use_key])
+            labels[i] = firsts.setdefault(key, labels[i])
+
+    return [f for f, label in zip(files, labels) if label in needed]
 
 
 #
@@ -61,6 +145,26 @@ def load_json(stat_arr, options):
     if options['filter']:
         stat_arr.filterinsts(options['filter'])
 
+    if len(options['keys']) == 1:
+        return extract(stat_arr, options)
+
+    # the instances are shared by all the keys; VBSes depend on the key
+    # and are dropped before making those of the next key
+    data, count = collections.OrderedDict(), len(stat_arr.stat_objs)
+    for key in options['keys']:
+        data[key] = extract(stat_arr, dict(options, key=key))
+        stat_arr.truncate(count)
+
+    return data
+
+
+#
+#==============================================================================
+def extract(stat_arr, options):
+    """
+        Extracts the data of the key options['key'].
+    """
+
     data = []
 
     # choosing the minimal value
@@ -72,19 +176,24 @@ def load_json(stat_arr, options):
             min_value = options['y_min']  # options['y_min'] is always defined
     max_value = float(options['timeout']) if options['plot_type'] == 'scatter' else 10 * float(options['timeout'])
     
-    # make VBSes
-    if options['vbs']:
-        for vbs_name, tools in options['vbs'].items():
-            stat_arr.make_vbs(vbs_name, tools, options['key'])
+    # make VBSes, including the best portfolios
+    vbses = list(options['vbs'].items()) if options['vbs'] else []
+    if options['portfolio']:
+        vbses.extend(find_portfolios(stat_arr, options))
+
+    if vbses:
+        stat_arr.make_vbses(vbses, options['key'])
+
+        if options['dry_run']:
+            for vbs in stat_arr.stat_objs[-len(vbses):]:
+                report_wins(vbs.label, vbs.tools, vbs.winners)
     
     # processing (normal) separate data
-    for stat_obj in stat_arr:
-        data.append(stat_obj.get_data(options, min_value, max_value))
+    data.extend(stat_arr.get_data(options, min_value, max_value, sort=options['plot_type'] == 'cactus'))
 
     if options['ratio']:
         max_value = float(options['timeout']) if options['plot_type'] == 'scatter' else 10 * float(options['y_max'] if options['y_max'] else options['timeout'])
-        for ratio_name, tools in options['ratio'].items():
-            data.append(stat_arr.create_ratio(ratio_name, tools, options['key'], options['timeout'], max_value))
+        data.extend(stat_arr.create_ratios(list(options['ratio'].items()), options['key'], options['timeout'], max_value))
 
     if options['only']:
         data = [d for d in data if d[0] in options['only']]
@@ -101,11 +210,15 @@ def load_json(stat_arr, options):
 
 #
 #==============================================================================
-def load_csv(names, stats, options):
+def load_csv(table, options):
     """
-        Loads runtime CSV data.
+        Loads runtime CSV data. A CSV table has a single measure, so the
+        keys are ignored.
     """
 
+    if len(options['keys']) > 1:
+        sys.stderr.write('\033[33;1mWarning:\033[m CSV data has a single measure; --key is ignored\n')
+
     # choosing the minimal value
     min_val = 0.000000001
     if options['plot_type'] == 'scatter':
@@ -114,86 +227,44 @@ def load_csv(names, stats, options):
         else:
             min_val = options['y_min']  # options['y_min'] is always defined
 
+    names = table.names[:]
     names_orig = names[:]
 
     if options['repls']:
         names = [options['repls'][n] if n in options['repls'] else n for n in names]
 
-    # processing (normal) separate data
-    lens = [0 for n in names]
-    vals_all = [[] for n in names]
-    last_vals = [-1 for n in names]
-
-    for vlist in stats:
-        vlist = [float(val) for val in vlist]
-
-        for i, val in enumerate(vlist):
-            if val < float(options['timeout']):
-                if val > last_vals[i]:
-                    last_vals[i] = val
-
-                if val < min_val:
-                    val = min_val
+    timeout = float(options['timeout'])
+    fail_val = timeout * 10 if options['plot_type'] == 'cactus' else timeout
 
-                lens[i] += 1
-            else:
-                val = float(options['timeout'])
-                if options['plot_type'] == 'cactus':
-                    val *= 10
-
-            vals_all[i].append(val)
+    # processing (normal) separate data
+    solved = table.vals < timeout  # missing values are NaN, i.e. unsolved
+    vals_all = list(np.where(solved, np.maximum(table.vals, min_val), fail_val).T)
+    lens = solved.sum(axis=0).tolist()
+    last_vals = np.where(solved, table.vals, -1).max(axis=0, initial=-1).tolist()
 
-    # processing VBSes
+    # processing VBSes: min-reduction over the columns of each VBS
     if options['vbs']:
-        for vbs_name, tools in options['vbs'].items():
-            vals = []
-            len_ = 0
-            last_val = -1
-
-            if tools != 'all':
-                tools = [n if n in tools else '' for n in names_orig]
-
-                for vlist in stats:
-                    vlist = [float(val) for i, val in enumerate(vlist) if tools[i]]
-                    val = min(vlist)
-
-                    if val < float(options['timeout']):
-                        if val > last_val:
-                            last_val = val
-
-                        if val < min_val:
-                            val = min_val
-
-                        len_ += 1
-                    else:
-                        val = options['timeout']
-                        if options['plot_type'] == 'cactus':
-                            val *= 10
+        filled = np.where(np.isnan(table.vals), np.inf, table.vals)
+        rows = np.arange(len(filled))
+        tools_all = names_orig[:]
 
-                    vals.append(val)
-            else:  # VBS among all the tools
-                for vlist in stats:
-                    val = min([float(val) for val in vlist])
-
-                    if val < float(options['timeout']):
-                        if val > last_val:
-                            last_val = val
+        for vbs_name, tools in options['vbs'].items():
+            cols = [i for i, n in enumerate(tools_all) if tools == 'all' or n in tools]
 
-                        if val < min_val:
-                            val = min_val
+            best = filled[:, cols].argmin(axis=1)
+            val = filled[rows, np.array(cols)[best]]
+            solved = val < timeout
 
-                        len_ += 1
-                    else:
-                        val = options['timeout']
-                        if options['plot_type'] == 'cactus':
-                            val *= 10
+            last_val = max(-1, val[solved].max()) if solved.any() else -1
+            vals = np.where(solved, np.maximum(val, min_val), fail_val)
 
-                    vals.append(val)
+            if options['dry_run']:
+                report_wins(vbs_name, [tools_all[i] for i in cols], np.where(solved, best, -1))
 
             names.append(vbs_name)
             names_orig.append(vbs_name)
             vals_all.append(vals)
-            lens.append(len_)
+            lens.append(np.count_nonzero(solved))
             last_vals.append(last_val)
 
     data = [[n, t, s, l] for n, t, s, l in zip(names, vals_all, lens, last_vals)]
@@ -205,3 +276,43 @@ def load_csv(names, stats, options):
     if (options['ordering'] == "fixed"):
         return data
     return sorted(data, key=lambda x: x[2] + len(x[1]) / sum(x[1]), reverse=not (options['ordering'] == "reverse"))
+
+
+#
+#==============================================================================
+def find_portfolios(stat_arr, options):
+    """
+        Searches for the best portfolios of the sizes given by --portfolio
+        and shows them. Returns them as (name, tools) VBS definitions.
+    """
+
+    cols = stat_arr.columns()
+    labels = [stat_obj.label for stat_obj in stat_arr]
+    pf = portfolio.Portfolio(cols.status, cols.values(options['key']), options['timeout'])
+
+    vbses = []
+    for k in options['portfolio']:
+        tools = pf.search(k, options['portfolio_search'])
+        solved, par2 = pf.score(tools)
+
+        print('portfolio of {0}: {1}'.format(k, ', '.join(labels[j] for j in tools)))
+        print('    # solved: {0}'.format(solved))
+        print('    PAR-2: {0:.1f}'.format(par2))
+
+        vbses.append(('portfolio-{0}'.format(k), [labels[j] for j in tools]))
+
+    return vbses
+
+
+#
+#==============================================================================
+def report_wins(vbs_name, tools, winners):
+    """
+        Shows how many instances of a VBS come from each of its tools.
+    """
+
+    wins = np.bincount(winners[winners >= 0], minlength=len(tools))
+
+    print('{0} (wins):'.format(vbs_name))
+    for tool, count in sorted(zip(tools, wins.tolist()), key=lambda x: -x[1]):
+        print('    {0}: {1}'.format(tool, count))
@@ -11,33 +11,44 @@
 #
 #==============================================================================
 from __future__ import print_function
-import matplotlib
-matplotlib.use('pdf')  # for not loading GUI modules
-
-from cactus import Cactus
+import collections
 import getopt
+import glob
+import itertools
 import json
-from load import load_data
+import load
+from fileutil import read_defaults
 import os
-from scatter import Scatter
+import renderer
 import sys
 
+try:  # YAML manifests are optional
+    import yaml
+except ImportError:
+    yaml = None
+
 
 #
 #==============================================================================
-def parse_options():
+def parse_options(argv=None):
     """
-        Parses command-line options:
+        Parses command-line options (by default, those of sys.argv):
     """
 
     try:
-        opts, args = getopt.getopt(sys.argv[1:],
+        opts, args = getopt.getopt(sys.argv[1:] if argv is None else argv,
                                    'a:b:c:df:hj:k:lp:r:t:',
                                    ['title=',
                                     'alpha=',
                                     'backend=',
+                                    'batch=',
+                                    'cache=',
+                                    'cache-size=',
                                     'config=',
+                                    'csv-delim=',
+                                    'datasets=',
                                     'dry-run',
+                                    'dup-tol=',
                                     'filter=',
                                     'font=',
                                     'font-sz=',
@@ -45,20 +56,34 @@ def parse_options():
                                     'axis-label-sz=',
                                     'no-grid',
                                     'help',
+                                    'highlight=',
+                                    'jobs=',
                                     'join-key=',
                                     'key=',
                                     'latex',
                                     'lalpha=',
                                     'legend=',
+                                    'line-collection',
                                     'lloc=',
+                                    'lmax=',
                                     'lncol=',
                                     'only=',
                                     'plot-type=',
+                                    'port=',
+                                    'portfolio=',
+                                    'portfolio-search=',
                                     'replace=',
+                                    'raster-dpi=',
+                                    'raster-report',
+                                    'raster-threshold=',
+                                    'rasterize',
                                     'ratio=',
                                     'ordering=',
+                                    'queue-size=',
                                     'save-to=',
+                                    'serve',
                                     'shape=',
+                                    'stream',
                                     'timeout=',
                                     'tol',
                                     'tlabel=',
@@ -76,7 +101,10 @@ def parse_options():
                                     'ymin=',
                                     'ymax=',
                                     'markevery=',
-                                    'scatter-color='
+                                    'max-points=',
+                                    'scatter-bins=',
+                                    'scatter-color=',
+                                    'scatter-mode='
                                     ])
     except getopt.GetoptError as err:
         sys.stderr.write(str(err).capitalize() + '\n')
@@ -91,9 +119,8 @@ def parse_options():
     else:
         def_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'defaults.json')
 
-    with open(def_path, 'r') as fp:
-        options = json.load(fp)['settings']
-        options['def_path'] = def_path
+    options = dict(read_defaults(def_path)['settings'])
+    options['def_path'] = def_path
 
     options['title'] = ""
     options['tol'] = False
@@ -101,9 +128,33 @@ def parse_options():
     options['axis_label_sz'] = 12.0
     options['ordering'] = "sorted"
     options['markevery'] = -1
+    options['max_points'] = 0
+    options['scatter_mode'] = 'points'
+    options['scatter_bins'] = 60
+    options['dup_tol'] = None
+    options['line_collection'] = False
+    options['highlight'] = 0
+    options['lgd_max'] = 0
+    options['rasterize'] = False
+    options['raster_dpi'] = 300
+    options['raster_threshold'] = 200000
+    options['raster_report'] = False
     options['filter'] = False
     options['ratio'] = None
     options['use_tick_sep'] = False
+    options['jobs'] = 1
+    options['stream'] = False
+    options['cache'] = None
+    options['cache_size'] = 1024
+    options['portfolio'] = None
+    options['portfolio_search'] = 'auto'
+    options['csv_delim'] = ' '
+    options['keys'] = [options['key']]
+    options['batch'] = None
+    options['serve'] = False
+    options['port'] = 8000
+    options['queue_size'] = 16
+    options['datasets'] = 8
     # parsing command-line options
     for opt, arg in opts:
         if opt == '--title':
@@ -112,10 +163,22 @@ def parse_options():
             options['alpha'] = float(arg)
         elif opt in ('-b', '--backend'):
             options['backend'] = str(arg)
+        elif opt == '--batch':
+            options['batch'] = str(arg)
+        elif opt == '--cache':
+            options['cache'] = str(arg)
+        elif opt == '--cache-size':
+            options['cache_size'] = int(arg)
+        elif opt == '--csv-delim':
+            options['csv_delim'] = {'space': ' ', 'tab': '\t', '\\t': '\t'}.get(str(arg), str(arg))
         elif opt in ('-c', '--config'):
             pass  # already processed
+        elif opt == '--datasets':
+            options['datasets'] = int(arg)
         elif opt in ('-d', '--dry-run'):
             options['dry_run'] = True
+        elif opt == '--dup-tol':
+            options['dup_tol'] = float(arg)
         elif opt == '--filter':
             options['filter'] = json.loads(str(arg))
         elif opt in ('-f', '--font'):
@@ -129,36 +192,65 @@ def parse_options():
         elif opt in ('-h', '--help'):
             usage()
             sys.exit(0)
+        elif opt == '--highlight':
+            options['highlight'] = int(arg)
         elif opt == '--no-grid':
             options['no_grid'] = True
+        elif opt == '--jobs':
+            options['jobs'] = int(arg)
         elif opt in ('-j', '--join-key'):
             options['join_key'] = [k.strip() for k in str(arg).split(',')]
         elif opt in ('-k', '--key'):
-            options['key'] = str(arg)
+            options['keys'] = [k.strip() for k in str(arg).split(',')]
+            options['key'] = options['keys'][0]
         elif opt in ('-l', '--latex'):
             options['usetex'] = True
         elif opt == '--lalpha':
             options['lgd_alpha'] = float(arg)
         elif opt == '--legend':
             options['legend'] = [k.strip() for k in str(arg).split(',')]
+        elif opt == '--line-collection':
+            options['line_collection'] = True
         elif opt == '--lloc':
             options['lgd_loc'] = str(arg)
+        elif opt == '--lmax':
+            options['lgd_max'] = int(arg)
         elif opt == '--lncol':
             options['lgd_ncol'] = int(arg)
         elif opt == '--only':
             options['only'] = [t.strip() for t in str(arg).split(',')]
         elif opt in ('-p', '--plot-type'):
             options['plot_type'] = str(arg)
+        elif opt == '--portfolio':
+            options['portfolio'] = [int(k) for k in str(arg).split(',')]
+        elif opt == '--portfolio-search':
+            options['portfolio_search'] = str(arg)
         elif opt in ('-r', '--replace'):
             options['repls'] = json.loads(str(arg))
+        elif opt == '--raster-dpi':
+            options['raster_dpi'] = int(arg)
+        elif opt == '--raster-report':
+            options['raster_report'] = True
+        elif opt == '--raster-threshold':
+            options['raster_threshold'] = int(arg)
+        elif opt == '--rasterize':
+            options['rasterize'] = True
         elif opt == '--ratio':
             options['ratio'] = json.loads(str(arg))
         elif opt == '--ordering':
             options['ordering'] = str(arg)
+        elif opt == '--port':
+            options['port'] = int(arg)
+        elif opt == '--queue-size':
+            options['queue_size'] = int(arg)
+        elif opt == '--serve':
+            options['serve'] = True
         elif opt == '--save-to':
             options['save_to'] = str(arg)
         elif opt == '--shape':
             options['shape'] = str(arg)
+        elif opt == '--stream':
+            options['stream'] = True
         elif opt in ('-t', '--timeout'):
             options['timeout'] = float(arg)
         elif opt == '--tol':
@@ -193,8 +285,14 @@ def parse_options():
             options['y_max'] = float(arg)
         elif opt == '--markevery':
             options['markevery'] = int(arg)
+        elif opt == '--max-points':
+            options['max_points'] = int(arg)
+        elif opt == '--scatter-bins':
+            options['scatter_bins'] = int(arg)
         elif opt == '--scatter-color':
             options['scatter-color'] = str(arg)
+        elif opt == '--scatter-mode':
+            options['scatter_mode'] = str(arg)
         else:
             assert False, 'Unhandled option: {0} {1}'.format(opt, arg)
 
@@ -215,9 +313,24 @@ def usage():
     print('                                        Available values: [0 .. 1] (default = 0.3)')
     print('        -b, --backend=<string>          Backend to use')
     print('                                        Available values: pdf, pgf, png, ps, svg (default = pdf)')
+    print('                                        Several comma-separated backends make one file per backend')
+    print('        --batch=<file>                  Make all the plots of a JSON or YAML manifest in one process')
+    print('                                        Format: {"defaults": {options}, "plots": [{"files": [...], options}, ...]}')
+    print('                                        Options are named as the settings of defaults.json; paths are relative to the manifest')
+    print('        --cache=<string>                Directory to cache parsed input files in')
+    print('                                        Available values: local (.mkplot-cache next to each file), any path (default = none)')
+    print('        --cache-size=<int>              Maximal size of the cache directory in MiB (default = 1024)')
     print('        -c, --config=<string>           Path to the default configuration file (default = $MKPLOT/defaults.json)')
+    print('        --csv-delim=<char>              Delimiter of the columns in CSV input files')
+    print('                                        Available values: any character, space, tab (default = space)')
+    print('        --datasets=<int>                Number of datasets kept in memory by the server (default = 8)')
     print('        -d, --dry-run                   Do not create a plot but instead show the tools sorted in the terminal')
+    print('        --dup-tol=<float>               Draw duplicated points of a scatter plot once, more opaque')
+    print('                                        Points closer than this many decades are merged (default = none, 0 for exact duplicates)')
     print('        --filter=<json-string>          Only include instances with key=value. Format: {"key": value}. (default = none)')
+    print('                                        Values can be lists or operators: {"size": {">=": 3, "<": 10}, "family": {"not": ["bmc"]},')
+    print('                                        "@instance": {"re": "^sat-"}}; operators: ==, !=, <, <=, >, >=, in, re, not')
+    print('                                        A dictionary with other keys than operators is a value: {"cfg": {"x": 1}}')
     print('        -f, --font=<string>             Font to use')
     print('                                        Available values: cmr, helvetica, palatino, times (default = times)')
     print('        --font-sz=<int>                 Font size to use')
@@ -227,33 +340,66 @@ def usage():
     print('        --axis-label-sz=<int>           Font size to use for axis labels')
     print('                                        Available values: [0 .. INT_MAX] (default = 12)')
     print('        -h, --help                      Show this message')
+    print('        --highlight=<int>               Highlight the first lines of a cactus plot (the best ones), fading the others')
+    print('                                        Available values: [0 .. INT_MAX] (default = 0, meaning none)')
     print('        --no-grid                       Do not show the grid')
+    print('        --jobs=<int>                    Number of processes used to read the input files and to make')
+    print('                                        several figures (0 means one per CPU)')
+    print('                                        Files are read by at most one process per CPU')
+    print('                                        Available values: [0 .. INT_MAX] (default = 1)')
     print('        -j, --join-key=<string-list>    Comma-separated list of keys to join all benchmarks per each tool')
     print('        -k, --key=<string>              Key to measure')
+    print('                                        Several comma-separated keys make one figure per key, saved with a -<key> suffix')
     print('                                        Available values: \'rtime\', for others look at the STAT file (default = \'rtime\')')
     print('        -l, --latex                     Use latex')
     print('        --lalpha=<float>                Legend transparency level')
     print('                                        Available values: [0 .. 1] (default = 1.0)')
     print('        --legend=<string-list>          Comma-separated list of keys to use in the legend of a plot')
     print('                                        Format: "program,prog_args" (default = program)')
+    print('        --line-collection               Draw all the lines of a cactus plot as one collection, without markers')
+    print('                                        (much faster for hundreds of lines)')
     print('        --lloc=<string>                 Legend location')
     print('                                        Available values: upper/center/lower left/right, center, best, off (default = upper left)')
+    print('        --lmax=<int>                    Maximal number of legend entries, the first lines of the plot')
+    print('                                        Available values: [0 .. INT_MAX] (default = 0, meaning all)')
     print('        --lncol=<int>                   Number of columns in the legend')
     print('                                        Available values: [1 .. INT_MAX] (default = 1)')
+    print('        --max-points=<int>              Maximal number of points drawn per line of a cactus plot')
+    print('                                        (every drawn point is within 2 / max-points of the X axis of the exact line)')
+    print('                                        Available values: [0 .. INT_MAX] (default = 0, meaning all)')
     print('        --only=<string-list>            Comma-separated list of names')
     print('                                        Format: "tool1,tool2" (default = none)')
+    print('                                        (input files of the other tools, unless used by a VBS or ratio, are not loaded)')
+    print('        --port=<int>                    Port of the server (default = 8000)')
     print('        -p, --plot-type=<string>        Plot type to produce')
     print('                                        Available values: cactus or scatter (default = cactus)')
+    print('        --portfolio=<int-list>          Comma-separated sizes of tool portfolios to find and plot as VBSes')
+    print('                                        (the best portfolio solves the most instances, then has the lowest PAR-2)')
+    print('        --portfolio-search=<string>     How to search for portfolios')
+    print('                                        Available values: auto, exact, greedy (default = auto)')
     print('        -r, --replace=<json-string>     List of name replacements')
     print('                                        Format: {"name1": "$nice_name1$", "name2": "$nice_name2$"} (default = none)')
+    print('        --raster-dpi=<int>              Resolution of rasterized data layers (default = 300)')
+    print('        --raster-report                 Report the size of a figure with rasterized data layers')
+    print('                                        along with the size it would have fully vector')
+    print('        --raster-threshold=<int>        Rasterize the data layers of pdf, pgf, ps and svg figures')
+    print('                                        having at least this many points (default = 200000, 0 for never)')
+    print('        --rasterize                     Always rasterize the data layers (lines, markers) of pdf, pgf, ps')
+    print('                                        and svg figures; the axes, text and legend stay vector')
     print('        --ratio=<json-string>           List of ratios to calculate: a/b per instance')
     print('                                        Format: {"ratio-name1": ["solver-a", "solver-b"], "ratio-name2": ["solver-a", "solver-b"]} (default = none)')
     print('        --ordering=<string>             Define how to ordering for scatter plot (cactus?)')
     print('                                        Values: sorted, reverse, fixed (default = sorted)')
+    print('        --queue-size=<int>              Maximal number of requests waiting in the server (default = 16)')
     print('        --save-to=<string>              Where result figure should be saved')
     print('                                        Default value: plot')
+    print('        --serve                         Run a plotting server on localhost taking the arguments of mkplot.py')
+    print('                                        in POST /plot requests: {"args": [...]}; uses --jobs workers')
     print('        --shape=<string>                Shape of the plot')
     print('                                        Available values: long, squared, standard (default = standard)')
+    print('        --stream                        Stream the input files keeping only the instance keys needed for the plot')
+    print('                                        (trades speed for memory: about half the memory of STAT files')
+    print('                                        with many other keys, but slower to read)')
     print('        -t, --timeout=<int>             Timeout value')
     print('                                        Available values: [0 .. INT_MAX] (default = 3600)')
     print('        --tol                           Whether to print timeout labels (default=false)')
@@ -279,32 +425,179 @@ def usage():
     print('                                        Available values: [0 .. INT_MAX] (default = 0)')
     print('        --markevery=<int>               Marker every X points')
     print('                                        Available values: [0 .. INT_MAX] (default = read from json)')
+    print('        --scatter-bins=<int>            Number of bins per axis of a density scatter plot')
+    print('                                        Available values: [1 .. INT_MAX] (default = 60)')
     print('        --scatter-color=<string>        Color of points in scatter plot')
     print('                                        Available values: [] (default = read from json)')
+    print('        --scatter-mode=<string>         How to draw the instances of a scatter plot')
+    print('                                        Available values: points, hexbin, hist2d (default = points)')
+    print('                                        (hexbin and hist2d show the density of instances on a log color scale')
+    print('                                        and the number of timeouts at the edges; for very many instances)')
+
+#
+#==============================================================================
+def render(data, options, pool=None):
+    """
+        Makes the figures of loaded data (one per key and backend), in the
+        given RenderPool if any, or, in the dry-run mode, shows their
+        summary. Returns the names of the files and the pool tasks making
+        them.
+    """
+
+    # one figure per key
+    if isinstance(data, dict):
+        figures = []
+        for key, key_data in data.items():
+            key_opts = dict(options, key=key, save_to='{0}-{1}'.format(os.path.splitext(options['save_to'])[0], key))
+            if options['plot_type'] == 'cactus' and not options['y_label']:
+                key_opts['y_label'] = key
+            figures.append((key_opts, key_data))
+    else:
+        figures = [(options, data)]
+
+    # and per backend
+    backends = options['backend'].split(',')
+    if len(backends) > 1 and not options['dry_run']:
+        figures = [(dict(fig_opts, backend=b.strip()), data) for fig_opts, data in figures for b in backends]
+
+    files, tasks = [], []
+    for fig_opts, data in figures:
+        if options['dry_run']:
+            if len(figures) > 1:
+                print('[{0}]'.format(fig_opts['key']))
+
+            for d in data:
+                d1 = list(map(lambda x: min(x, options['timeout']), d[1]))
+
+                print('{0}:'.format(d[0]))
+                print('    # solved: {0}'.format(d[2]))
+                print('    min. val: {0:.1f}'.format(float(min(d1))))
+                print('    max. val: {0:.1f}'.format(float(max(d1))))
+                print('    avg. val: {0:.1f}'.format(float(sum(d1)) / len(d1)))
+        else:
+            files.append('{0}.{1}'.format(os.path.splitext(fig_opts['save_to'])[0], fig_opts['backend']))
+
+            if pool:
+                tasks.append(pool.submit(fig_opts, data))
+            else:
+                renderer.draw(fig_opts, data)
+
+    return files, tasks
+
+
+#
+#==============================================================================
+def read_manifest(filename, options):
+    """
+        Reads a batch manifest, i.e. a JSON or YAML file with a list of
+        plots (or a dictionary with 'defaults' and 'plots'). Each plot is
+        a dictionary of options with the list of its input 'files'; it is
+        returned as a complete dictionary of options.
+    """
+
+    with open(filename, 'r') as fp:
+        if os.path.splitext(filename)[1].lower() in ('.yml', '.yaml'):
+            if yaml is None:
+                raise ValueError('reading \'{0}\' requires the yaml module'.format(filename))
+            manifest = yaml.safe_load(fp)
+        else:
+            manifest = json.load(fp)
+
+    if isinstance(manifest, list):
+        manifest = {'plots': manifest}
+
+    base = os.path.dirname(os.path.abspath(filename))
+    path = lambda p: os.path.join(base, os.path.expanduser(p))
+
+    specs = []
+    for i, plot in enumerate(manifest['plots']):
+        spec = dict(options)
+        spec.update(manifest.get('defaults', {}))
+        spec.update(plot)
+
+        unknown = set(spec) - set(options) - set(['files', 'scatter-color'])
+        if unknown:
+            raise ValueError('plot {0} of \'{1}\' has unknown options: {2}'.format(i, filename, ', '.join(sorted(unknown))))
+
+        # the key may be given as a list or a comma-separated string
+        keys = spec['key'] if isinstance(spec['key'], list) else spec['key'].split(',')
+        spec['keys'] = [k.strip() for k in keys]
+        spec['key'] = spec['keys'][0]
+
+        files = spec.get('files', [])
+        spec['files'] = sum([sorted(glob.glob(path(f))) or [path(f)] for f in ([files] if isinstance(files, str) else files)], [])
+        spec['save_to'] = path(spec['save_to'])
+
+        if not spec['files']:
+            raise ValueError('plot {0} of \'{1}\' has no input files'.format(i, filename))
+
+        specs.append(spec)
+
+    return specs
+
+
+#
+#==============================================================================
+def run_batch(manifest, options):
+    """
+        Makes all the plots of a manifest. Each distinct set of input files
+        is read once and shared by all its plots. With several jobs, the
+        figures are made in parallel while the next inputs are read.
+    """
+
+    specs = read_manifest(manifest, options)
+
+    # plots grouped by their input
+    groups = collections.OrderedDict()
+    for spec in specs:
+        ident = (tuple(spec['files']), json.dumps(spec['legend']), spec['csv_delim'])
+        groups.setdefault(ident, []).append(spec)
+
+    pool = renderer.RenderPool(options['jobs']) if options['jobs'] != 1 and not options['dry_run'] else None
+
+    try:
+        for group in groups.values():
+            # streaming the union of the keys needed by the plots
+            stream = all(spec['stream'] for spec in group)
+            keys = sorted(set(itertools.chain.from_iterable(map(load.stream_keys, group)))) if stream else None
+
+            raw = load.read_data(group[0]['files'], dict(group[0], only=None, stream=stream), keys)
+
+            for spec in group:
+                render(load.process_data(raw, spec, copy=True), spec, pool)
+    finally:
+        if pool:
+            pool.close()
+
 
 #
 #==============================================================================
 if __name__ == '__main__':
     options, fns = parse_options()
 
+    if options['batch']:
+        run_batch(options['batch'], options)
+        sys.exit(0)
+
+    if options['serve']:
+        import server  # not loading the HTTP modules otherwise
+
+        app = server.RenderServer(parse_options, render, options['jobs'], options['queue_size'], options['datasets'])
+        app.serve('localhost', options['port'])
+        sys.exit(0)
+
     if not fns:
         pass  # error handling
 
-    data = load_data(fns, options)
-
-    if options['dry_run']:
-        for d in data:
-            d1 = list(map(lambda x: min(x, options['timeout']), d[1]))
+    data = load.load_data(fns, options)
 
-            print('{0}:'.format(d[0]))
-            print('    # solved: {0}'.format(d[2]))
-            print('    min. val: {0:.1f}'.format(float(min(d1))))
-            print('    max. val: {0:.1f}'.format(float(max(d1))))
-            print('    avg. val: {0:.1f}'.format(float(sum(d1)) / len(d1)))
-    else:
-        if options['plot_type'] == 'cactus':
-            plotter = Cactus(options)
-        else:
-            plotter = Scatter(options)
+    # several figures are made in parallel
+    pool = None
+    if options['jobs'] != 1 and not options['dry_run'] and (isinstance(data, dict) or ',' in options['backend']):
+        pool = renderer.RenderPool(options['jobs'])
 
-        plotter.create(data)
+    try:
+        render(data, options, pool)
+    finally:
+        if pool:
+            pool.close()
@@ -10,9 +10,11 @@
 
 #
 #==============================================================================
+import io
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+import sys
 
 
 #
@@ -64,6 +66,18 @@ class Plot():
         # where to save
         self.save_to = '{0}.{1}'.format(os.path.splitext(self.save_to)[0], self.backend)
 
+        # no timestamps or random IDs, so that a figure always gives the
+        # same file, whichever process makes it
+        self.metadata = {'pdf': {'CreationDate': None}, 'ps': {'CreationDate': None}, 'svg': {'Date': None}}.get(self.backend)
+        plt.rcParams['svg.hashsalt'] = 'mkplot'
+
+        # artists of the data (lines, markers), which may be rasterized
+        self.layers = []
+        self.rasterize = options['rasterize']
+        self.raster_dpi = options['raster_dpi']
+        self.raster_threshold = options['raster_threshold']
+        self.raster_report = options['raster_report']
+
         # font properties
         self.f_props = {'serif': ['Times'], 'sans-serif': ['Helvetica'],
         'weight': 'normal', 'size': options['font_sz']}
@@ -111,7 +125,7 @@ class Plot():
             plt.switch_backend(self.backend)
         elif self.backend == 'pgf':  # PGF/TikZ
             pgf_params = {'pgf.texsystem': 'pdflatex',
-                          'pgf.preamble': [r'\usepackage[utf8x]{inputenc}', r'\usepackage[T1]{fontenc}']}
+                          'pgf.preamble': '\n'.join([r'\usepackage[utf8x]{inputenc}', r'\usepackage[T1]{fontenc}'])}
             params.update(pgf_params)
             plt.rcParams.update(params)
             plt.switch_backend(self.backend)
@@ -123,3 +137,36 @@ class Plot():
             plt.xkcd()
 
         plt.title(options['title'], fontsize=options['title_sz'], y=1.05)
+
+    def save(self, points):
+        """
+            Saves the figure. In vector formats, the data layers are
+            rasterized at raster_dpi if asked to or if they have at least
+            raster_threshold points, while the axes, text and legend stay
+            vector. If asked to, the size of the file is then reported
+            along with that of the fully vector figure.
+        """
+
+        raster = self.backend != 'png' and (self.rasterize or 0 < self.raster_threshold <= points)
+        for layer in self.layers:
+            layer.set_rasterized(raster)
+
+        params = {'bbox_inches': 'tight', 'transparent': self.transparent, 'metadata': self.metadata}
+        plt.savefig(self.save_to, **dict(params, dpi=self.raster_dpi) if raster else params)
+
+        if raster and self.raster_report:
+            for layer in self.layers:
+                layer.set_rasterized(False)
+
+            vector = io.BytesIO()
+            plt.savefig(vector, format=self.backend, **params)
+
+            sys.stderr.write('{0}: {1:.1f} KiB with {2} points rasterized, {3:.1f} KiB fully vector\n'.format(self.save_to,
+                os.path.getsize(self.save_to) / 1024.0, points, len(vector.getvalue()) / 1024.0))
+
+    def close(self):
+        """
+            Closes the figure, so that the next plot starts from a blank one.
+        """
+
+        plt.close('all')
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## portfolio.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+from math import factorial
+import numpy as np
+
+
+#
+#==============================================================================
+def comb(n, k):
+    """
+        Binomial coefficient.
+    """
+
+    return factorial(n) // (factorial(k) * factorial(n - k)) if k <= n else 0
+
+
+#
+#==============================================================================
+if hasattr(int, 'bit_count'):  # Python 3.10+
+    popcount = int.bit_count
+else:
+    def popcount(mask):
+        """
+            Number of bits set in an integer.
+        """
+
+        return bin(mask).count('1')
+
+
+#
+#==============================================================================
+class Portfolio(object):
+    """
+        Search for the k tools whose virtual best solver solves the most
+        instances and, among those, has the lowest PAR-2 score.
+
+        Solved instances of each tool are encoded as bitsets (Python
+        integers), so the number of instances solved by a subset is the
+        popcount of the union of its masks. The PAR-2 score of a subset is
+        the sum over all instances of the best value of its tools, where an
+        unsolved instance costs twice the timeout.
+    """
+
+    def __init__(self, solved, vals, timeout):
+        """
+            Constructor. solved and vals are matrices of shape (instances,
+            tools); an instance counts as solved by a tool if its status is
+            true and the value is below the timeout.
+        """
+
+        self.timeout = float(timeout)
+
+        solved = solved & (vals < self.timeout)
+        self.cost = np.where(solved, vals, 2 * self.timeout)
+        self.masks = [int.from_bytes(np.packbits(solved[:, j], bitorder='little').tobytes(), 'little')
+                for j in range(solved.shape[1])]
+
+    def score(self, tools):
+        """
+            Number of solved instances and PAR-2 score of a subset.
+        """
+
+        mask = 0
+        for j in tools:
+            mask |= self.masks[j]
+
+        return popcount(mask), float(self.cost[:, tools].min(axis=1).sum())
+
+    def exact(self, k):
+        """
+            Branch and bound over the subsets of size k. Tools are tried in
+            the order of decreasing number of solved instances. A branch is
+            pruned if it cannot beat the best subset found so far: the number
+            of instances it can solve is bounded by the sum of the largest
+            numbers of new instances the remaining tools solve (a union is
+            never larger than the sum of its parts) and, for a tie, its PAR-2
+            score is bounded by the minimum over all the remaining tools. The
+            greedy solution is used as the initial bound.
+        """
+
+        order = sorted(range(len(self.masks)), key=lambda j: -popcount(self.masks[j]))
+        masks = [self.masks[j] for j in order]
+        k = min(k, len(order))
+
+        # minima of the tools from position i on
+        suffix_min = np.full((len(order) + 1, self.cost.shape[0]), 2 * self.timeout)
+        for i in range(len(order) - 1, -1, -1):
+            suffix_min[i] = np.minimum(suffix_min[i + 1], self.cost[:, order[i]])
+
+        best = [self.greedy(k)]
+        best.append(self.score(best[0]))
+
+        def dfs(start, chosen, mask, cur_min):
+            left = k - len(chosen)
+            if left == 0:
+                score = (popcount(mask), float(cur_min.sum()))
+                if score[0] > best[1][0] or (score[0] == best[1][0] and score[1] < best[1][1]):
+                    best[:] = [sorted(chosen), score]
+                return
+
+            solved = popcount(mask)
+            gains = [popcount(m & ~mask) for m in masks[start:]]
+
+            # sums of the left - 1 largest gains after each position
+            tops, rest = [0] * len(gains), []
+            for i in range(len(gains) - 1, -1, -1):
+                tops[i] = sum(rest)
+                rest = sorted(rest + [gains[i]], reverse=True)[:left - 1]
+
+            for i in range(len(gains) - left + 1):
+                bound = solved + gains[i] + tops[i]
+                if bound < best[1][0]:
+                    continue
+                if bound == best[1][0] and np.minimum(cur_min, suffix_min[start + i]).sum() >= best[1][1]:
+                    continue
+
+                j = order[start + i]
+                dfs(start + i + 1, chosen + [j], mask | masks[start + i], np.minimum(cur_min, self.cost[:, j]))
+
+        dfs(0, [], 0, np.full(self.cost.shape[0], 2 * self.timeout))
+        return best[0]
+
+    def greedy(self, k):
+        """
+            Adds tools one by one, each time taking the one that improves
+            the solved count (then the PAR-2 score) of the subset the most.
+        """
+
+        chosen = []
+        cur_min = np.full(self.cost.shape[0], 2 * self.timeout)
+
+        for step in range(min(k, len(self.masks))):
+            cand = np.minimum(cur_min[:, None], self.cost)
+            solved = (cand < 2 * self.timeout).sum(axis=0)
+            par2 = cand.sum(axis=0)
+
+            # excluding the chosen tools
+            solved[chosen] = -1
+
+            # lexicographic choice: most solved, then lowest PAR-2
+            j = min(np.flatnonzero(solved == solved.max()), key=lambda j: par2[j])
+            chosen.append(int(j))
+            cur_min = cand[:, j]
+
+        return sorted(chosen)
+
+    def search(self, k, method='auto', limit=100000):
+        """
+            Returns the best subset of size k. With method 'auto', the exact
+            search is used if there are at most limit subsets to consider.
+        """
+
+        if method == 'exact' or (method == 'auto' and comb(len(self.masks), k) <= limit):
+            return self.exact(k)
+
+        return self.greedy(k)
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## records.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+try:  # Python 3.3+
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+import collections
+import itertools
+import json
+import numpy as np
+import operator
+import units
+
+
+#
+#==============================================================================
+class _Missing(object):
+    def __repr__(self):
+        return 'missing'
+
+    def __reduce__(self):
+        return 'missing'  # stays a singleton when pickled
+
+
+missing = _Missing()
+
+
+#
+#==============================================================================
+class RecordStore(object):
+    """
+        Compact storage of the instance records of a Stat object, one row
+        per instance and one column per key:
+
+            'num'   float64 values (NaN if missing); ints is True, False
+                    or a mask of the values that were integers
+            'bool'  boolean values and a mask of the present ones
+            'str'   strings kept in one text with per-row offsets; if they
+                    are numbers with units ('171864 KiB'), their normalized
+                    float64 values are kept as well
+            'json'  other values, JSON-encoded the same way
+
+        Text columns are decoded only when their values are asked for. The
+        status of each instance (status == True) is kept as a boolean
+        array. To rebuild records with their keys in the original order,
+        each row refers to one of the (few) distinct key orders. Columns
+        are never modified in place: every operation making a new store
+        shares or copies them.
+    """
+
+    def __init__(self, size=0):
+        """
+            Constructor.
+        """
+
+        self.size = size
+        self.keys = []
+        self.cols = {}
+        self.status = np.zeros(size, dtype=bool)
+        self.orders = [()]
+        self.order = np.zeros(size, dtype=np.intp)
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def from_records(cls, recs):
+        """
+            Builds a store from a list of record dictionaries. Records are
+            taken in runs having the same keys, whose values are gathered
+            in a single pass. The key order of each record is worked out
+            only if the records of its run do not all have their keys in
+            the same order.
+        """
+
+        store = cls(len(recs))
+        if not recs:
+            return store
+
+        # runs of records with the same keys (in most files, a single run
+        # of records with the same keys in the same order)
+        uniform = list(itertools.chain.from_iterable(recs)) == list(recs[0]) * len(recs)
+        if uniform:
+            starts = [0]
+        else:
+            change = list(map(operator.ne, map(dict.keys, recs[1:]), map(dict.keys, recs[:-1])))
+            starts = [0] + [i + 1 for i in itertools.compress(range(len(change)), change)]
+
+        parts, filled, orders = collections.OrderedDict(), {}, {}
+        for start, end in zip(starts, starts[1:] + [len(recs)]):
+            run = recs[start:end]
+            keys = tuple(run[0])
+
+            # values of the keys of the run (missing for the other keys);
+            # if the keys are in the same order, all the values are read
+            # at once and the columns are sliced out
+            if uniform or list(itertools.chain.from_iterable(run)) == list(keys) * len(run):
+                vals = list(itertools.chain.from_iterable(map(dict.values, run)))
+                vals = [vals[i::len(keys)] for i in range(len(keys))]
+                store.order[start:end] = orders.setdefault(keys, len(orders))
+            else:
+                vals = [list(map(operator.itemgetter(key), run)) for key in keys]
+                store.order[start:end] = [orders.setdefault(k, len(orders)) for k in map(tuple, run)]
+
+            for key, col in zip(keys, vals):
+                if filled.get(key, 0) < start:
+                    parts.setdefault(key, []).append([missing] * (start - filled.get(key, 0)))
+                parts.setdefault(key, []).append(col)
+                filled[key] = end
+
+        for key, cols in parts.items():
+            if filled[key] < len(recs):
+                cols.append([missing] * (len(recs) - filled[key]))
+            store.add(key, cols[0] if len(cols) == 1 else list(itertools.chain.from_iterable(cols)))
+
+        store.orders = list(orders)
+
+        return store
+
+    @classmethod
+    def concat(cls, stores):
+        """
+            Builds a store with the rows of several stores.
+        """
+
+        store = cls(sum(len(s) for s in stores))
+        keys = dict.fromkeys(itertools.chain.from_iterable(s.keys for s in stores))
+
+        for key in keys:
+            cols = [s.cols.get(key) for s in stores]
+            kinds = set(col['kind'] if col else None for col in cols)
+
+            if kinds == set(['num']):
+                ints = [col['ints'] for col in cols]
+                if any(type(i) is not bool or i != ints[0] for i in ints):
+                    ints = np.concatenate([np.full(len(s), i) if type(i) is bool else i for s, i in zip(stores, ints)])
+                else:
+                    ints = ints[0]
+
+                store.keys.append(key)
+                store.cols[key] = {'kind': 'num', 'vals': np.concatenate([col['vals'] for col in cols]), 'ints': ints}
+            elif len(kinds) == 1 and kinds <= set(['str', 'json']) and len(set('num' in col for col in cols)) == 1:
+                bases = np.cumsum([0] + [len(col['text']) for col in cols[:-1]])
+                offsets = [col['offsets'][:-1] + base for col, base in zip(cols, bases)]
+                offsets.append([sum(len(col['text']) for col in cols)])
+
+                store.keys.append(key)
+                store.cols[key] = {'kind': cols[0]['kind'], 'text': ''.join(col['text'] for col in cols),
+                        'offsets': np.concatenate(offsets), 'present': np.concatenate([col['present'] for col in cols])}
+                if 'num' in cols[0]:
+                    store.cols[key]['num'] = np.concatenate([col['num'] for col in cols])
+            else:
+                store.add(key, list(itertools.chain.from_iterable(s.column(key) for s in stores)))
+
+        if stores:
+            store.status = np.concatenate([s.status for s in stores])
+
+            orders = {}
+            store.order = np.concatenate([np.array([orders.setdefault(keys, len(orders)) for keys in s.orders],
+                dtype=np.intp)[s.order] for s in stores])
+            store.orders = list(orders)
+
+        return store
+
+    def add(self, key, col):
+        """
+            Adds (or replaces) a column given as a list of values (missing
+            for absent ones), choosing its compact representation.
+        """
+
+        types = set(map(type, col))
+        if _Missing in types:
+            present = np.array([v is not missing for v in col], dtype=bool)
+        else:
+            present = np.ones(len(col), dtype=bool)
+
+        vtypes = types - set([_Missing])
+        num = numeric(col, types, present) if vtypes <= set([int, float]) else None
+
+        if num is not None:
+            self.cols[key] = num
+        elif vtypes == set([bool]):
+            vals = np.array(col, dtype=bool) if _Missing not in types else np.array([v is True for v in col], dtype=bool)
+            self.cols[key] = {'kind': 'bool', 'vals': vals, 'present': present}
+        else:
+            kind = 'str' if vtypes == set([str]) else 'json'
+            if kind == 'str' and _Missing not in types:
+                parts = col
+            else:
+                dump = (lambda v: v) if kind == 'str' else json.dumps
+                parts = ['' if v is missing else dump(v) for v in col]
+
+            offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+            np.cumsum(np.fromiter(map(len, parts), dtype=np.int64, count=len(parts)), out=offsets[1:])
+
+            self.cols[key] = {'kind': kind, 'text': ''.join(parts), 'offsets': offsets, 'present': present}
+
+            if kind == 'str':
+                vals = units.parse(key, col if _Missing not in types else [v for v in col if v is not missing])
+                if vals is not None:
+                    self.cols[key]['num'] = np.full(len(col), np.nan)
+                    self.cols[key]['num'][present] = vals
+
+        if key not in self.keys:
+            self.keys.append(key)
+
+        if key == 'status':
+            if self.cols[key]['kind'] == 'bool':
+                self.status = self.cols[key]['vals'] & self.cols[key]['present']
+            else:
+                self.status = np.array([v == True for v in col], dtype=bool)
+
+    def present(self, key):
+        """
+            Mask of the rows having a value of the key.
+        """
+
+        col = self.cols.get(key)
+        if col is None:
+            return np.zeros(self.size, dtype=bool)
+        elif col['kind'] == 'num':
+            return ~np.isnan(col['vals'])
+
+        return col['present']
+
+    def column(self, key):
+        """
+            Returns the list of values of a key, missing for absent ones.
+            Text columns are decoded here.
+        """
+
+        col = self.cols.get(key)
+
+        if col is None:
+            return [missing] * self.size
+        elif col['kind'] == 'num':
+            vals = col['vals'].tolist()
+            if col['ints'] is True:
+                return [missing if v != v else int(v) for v in vals]  # NaN != NaN
+            elif col['ints'] is False:
+                return [missing if v != v else v for v in vals]
+
+            return [missing if v != v else (int(v) if i else v) for v, i in zip(vals, col['ints'].tolist())]
+        elif col['kind'] == 'bool':
+            return [v if p else missing for v, p in zip(col['vals'].tolist(), col['present'].tolist())]
+
+        text, offsets = col['text'], col['offsets'].tolist()
+        load = (lambda v: v) if col['kind'] == 'str' else json.loads
+
+        return [load(text[a:b]) if p else missing for a, b, p in zip(offsets, offsets[1:], col['present'].tolist())]
+
+    def floats(self, key):
+        """
+            Returns the values of a key as a float64 array, where missing
+            and non-numeric values are NaN, and whether all the values were
+            numeric (or null).
+        """
+
+        col = self.cols.get(key)
+
+        if col is None:
+            return np.full(self.size, np.nan), True
+        elif col['kind'] == 'num':
+            return col['vals'], True
+        elif 'num' in col:
+            return col['num'], True
+
+        vals = self.column(key)
+        num = [type(v) in (int, float) for v in vals]
+        numeric = all(n or v is missing or v is None for v, n in zip(vals, num))
+
+        return np.array([v if n else np.nan for v, n in zip(vals, num)], dtype=np.float64), numeric
+
+    def value(self, key, row):
+        """
+            Value of a key in a row (missing if absent).
+        """
+
+        col = self.cols.get(key)
+
+        if col is None:
+            return missing
+        elif col['kind'] == 'num':
+            v = col['vals'][row]
+            if v != v:
+                return missing
+
+            ints = col['ints']
+            return int(v) if (ints if type(ints) is bool else ints[row]) else float(v)
+        elif not col['present'][row]:
+            return missing
+        elif col['kind'] == 'bool':
+            return bool(col['vals'][row])
+
+        text = col['text'][col['offsets'][row]:col['offsets'][row + 1]]
+        return text if col['kind'] == 'str' else json.loads(text)
+
+    def record(self, row):
+        """
+            Builds the dictionary of a row.
+        """
+
+        rec = {}
+        for key in self.orders[self.order[row]] + tuple(self.keys):
+            if key not in rec:
+                v = self.value(key, row)
+                if v is not missing:
+                    rec[key] = v
+
+        return rec
+
+    def take(self, rows):
+        """
+            Builds a store of the given rows (an array of row indices).
+        """
+
+        rows = np.asarray(rows, dtype=np.intp)
+        store = RecordStore(len(rows))
+        store.keys = list(self.keys)
+        store.status = self.status[rows]
+        store.orders = self.orders
+        store.order = self.order[rows]
+
+        for key, col in self.cols.items():
+            if col['kind'] == 'num':
+                ints = col['ints']
+                store.cols[key] = {'kind': 'num', 'vals': col['vals'][rows], 'ints': ints if type(ints) is bool else ints[rows]}
+            elif col['kind'] == 'bool':
+                store.cols[key] = {'kind': 'bool', 'vals': col['vals'][rows], 'present': col['present'][rows]}
+            else:
+                text, offsets = col['text'], col['offsets']
+                slices = map(slice, offsets[rows].tolist(), offsets[rows + 1].tolist())
+
+                new = np.zeros(len(rows) + 1, dtype=np.int64)
+                np.cumsum(offsets[rows + 1] - offsets[rows], out=new[1:])
+
+                store.cols[key] = {'kind': col['kind'], 'text': ''.join(map(text.__getitem__, slices)),
+                        'offsets': new, 'present': col['present'][rows]}
+                if 'num' in col:
+                    store.cols[key]['num'] = col['num'][rows]
+
+        return store
+
+    def copy(self):
+        """
+            Shallow copy: the columns are shared, so that adding or
+            replacing columns does not change this store.
+        """
+
+        store = RecordStore(self.size)
+        store.keys = list(self.keys)
+        store.cols = dict(self.cols)
+        store.status = self.status
+        store.orders = self.orders
+        store.order = self.order
+
+        return store
+
+    def set_values(self, key, rows, value):
+        """
+            Sets the value of a key in several rows.
+        """
+
+        col = self.column(key)
+        for row in np.asarray(rows).tolist():
+            col[row] = value
+
+        self.add(key, col)
+
+
+#
+#==============================================================================
+def numeric(col, types, present):
+    """
+        Numeric column of a list of ints and floats. Returns None if some
+        values cannot be kept as float64 (large integers or NaN).
+    """
+
+    try:
+        if _Missing in types:
+            vals = np.array([np.nan if v is missing else v for v in col], dtype=np.float64)
+        else:
+            vals = np.array(col, dtype=np.float64)
+    except OverflowError:
+        return None
+
+    if np.isnan(vals[present]).any():
+        return None
+
+    if int not in types:
+        ints = False
+    elif float not in types:
+        ints = True
+        if (np.abs(vals[present]) > 2 ** 53).any():
+            return None
+    else:
+        ints = np.array([type(v) is int for v in col], dtype=bool)
+        if (np.abs(vals[ints]) > 2 ** 53).any():
+            return None
+
+    return {'kind': 'num', 'vals': vals, 'ints': ints}
+
+
+#
+#==============================================================================
+class RecordView(Mapping):
+    """
+        Read-only mapping from instance names to the records of a Stat
+        object. Records are built on access, so changing one does not
+        change the Stat object.
+    """
+
+    def __init__(self, stat):
+        """
+            Constructor.
+        """
+
+        self.stat = stat
+        self.rows = None
+        self.insts = None
+
+    def row(self, inst):
+        """
+            Row of an instance (None if the object does not have it).
+        """
+
+        if self.insts is not self.stat.insts_own:
+            self.insts = self.stat.insts_own
+            self.rows = {name: i for i, name in enumerate(self.insts)}
+
+        return self.rows.get(inst)
+
+    def __getitem__(self, inst):
+        row = self.row(inst)
+        if row is None:
+            raise KeyError(inst)
+
+        return self.stat.store.record(row)
+
+    def __contains__(self, inst):
+        return self.row(inst) is not None
+
+    def __iter__(self):
+        return iter(self.stat.insts_own)
+
+    def __len__(self):
+        return len(self.stat.insts_own)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## renderer.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+import multiprocessing
+import numpy as np
+import os
+import shutil
+import tempfile
+
+
+#
+#==============================================================================
+# the PostScript backend always writes a creation date, which it takes
+# from SOURCE_DATE_EPOCH; unless the variable is set, figures are drawn
+# with this fixed one, so that they do not depend on when they are made
+epoch = '0'
+
+# matplotlib backend of each output format
+backends = {'pdf': 'pdf', 'pgf': 'pgf', 'png': 'agg', 'ps': 'ps', 'svg': 'svg'}
+
+
+#
+#==============================================================================
+def draw(options, data):
+    """
+        Makes one figure. The rcParams changed by the plot are restored
+        afterwards.
+
+        Matplotlib is imported here, when the first figure is made, and
+        only the backend of its format is loaded (and no GUI modules), so
+        that dry runs and the other modes not plotting start quickly.
+    """
+
+    import matplotlib
+    matplotlib.use(backends.get(options['backend'], 'pdf'))
+
+    from cactus import Cactus
+    from scatter import Scatter
+
+    # the variable is only set while the figure is drawn
+    dated = options['backend'] == 'ps' and 'SOURCE_DATE_EPOCH' not in os.environ
+    if dated:
+        os.environ['SOURCE_DATE_EPOCH'] = epoch
+
+    try:
+        with matplotlib.rc_context():
+            if options['plot_type'] == 'cactus':
+                plotter = Cactus(options)
+            else:
+                plotter = Scatter(options)
+
+            plotter.create(data)
+            plotter.close()
+    finally:
+        if dated:
+            del os.environ['SOURCE_DATE_EPOCH']
+
+
+#
+#==============================================================================
+def _draw_shared(options, path, meta):
+    """
+        Makes a figure whose values are read from a memory-mapped file.
+        Used by the worker processes of RenderPool.
+    """
+
+    vals = np.memmap(path, dtype=np.float64, mode='r')
+
+    data, start = [], 0
+    for label, size, num_solved, last_val in meta:
+        data.append((label, vals[start:start + size], num_solved, last_val))
+        start += size
+
+    draw(options, data)
+
+
+#
+#==============================================================================
+class RenderPool(object):
+    """
+        Pool of processes making figures in parallel. The values of each
+        figure are written once into a memory-mapped file, which the worker
+        maps instead of receiving a pickled copy; only the options and the
+        labels go through the pipe. Figures are drawn exactly as in the
+        serial mode, so the files are the same.
+    """
+
+    def __init__(self, jobs):
+        """
+            Constructor. jobs is the number of processes (0 means one per
+            CPU).
+        """
+
+        self.tmpdir = tempfile.mkdtemp(prefix='mkplot-')
+        self.pool = multiprocessing.Pool(jobs or None)
+        self.tasks = []
+
+    def submit(self, options, data):
+        """
+            Queues a figure. Returns its task, which can be waited for with
+            wait().
+        """
+
+        try:
+            arrays = [np.asarray(d[1], dtype=np.float64) for d in data]
+        except (TypeError, ValueError):  # not numeric, passed as it is
+            self.tasks.append((self.pool.apply_async(draw, (options, data)), None))
+            return self.tasks[-1]
+
+        fd, path = tempfile.mkstemp(suffix='.f8', dir=self.tmpdir)
+        os.close(fd)
+        vals = np.memmap(path, dtype=np.float64, mode='w+', shape=(max(1, sum(map(len, arrays))),))
+
+        start = 0
+        for a in arrays:
+            vals[start:start + len(a)] = a
+            start += len(a)
+
+        vals.flush()
+        del vals
+
+        meta = [(d[0], len(a), d[2], d[3]) for d, a in zip(data, arrays)]
+        self.tasks.append((self.pool.apply_async(_draw_shared, (options, path, meta)), path))
+        return self.tasks[-1]
+
+    def wait(self, tasks=None):
+        """
+            Waits for the given (by default, all) tasks, raising the first
+            error of a worker, and removes their files.
+        """
+
+        tasks = list(self.tasks if tasks is None else tasks)
+        for task in tasks:
+            self.tasks.remove(task)
+
+        try:
+            for result, path in tasks:
+                result.get()
+        finally:
+            for result, path in tasks:
+                if path:
+                    result.wait()
+                    os.remove(path)
+
+    def close(self):
+        """
+            Waits for all the figures and removes the temporary files.
+        """
+
+        try:
+            self.pool.close()
+            self.wait()
+        finally:
+            self.pool.terminate()
+            self.pool.join()
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
@@ -10,13 +10,13 @@
 
 #
 #==============================================================================
-import json
+from fileutil import read_defaults
+from matplotlib.colors import LinearSegmentedColormap, LogNorm, to_rgba
 import matplotlib.pyplot as plt
 from matplotlib import __version__ as mpl_version
 import numpy as np
 from plot import Plot
 import six
-from six.moves import range
 
 
 #
@@ -64,12 +64,18 @@ class Scatter(Plot, object):
             self.t_label = '{0} sec. timeout'.format(int(self.timeout))
         self.t_label = ""
 
-        with open(self.def_path, 'r') as fp:
-            self.marker_style = json.load(fp)['scatter_style']
+        self.marker_style = dict(read_defaults(self.def_path)['scatter_style'])
 
         if "scatter-color" in options.keys():
           self.marker_style['color'] = options["scatter-color"]
 
+        self.mode = options['scatter_mode']
+        self.bins = options['scatter_bins']
+        self.dup_tol = options['dup_tol']
+
+        if self.mode not in ('points', 'hexbin', 'hist2d'):
+            raise ScatterException('Unknown scatter mode \'{0}\''.format(self.mode))
+
     def create(self, data):
         """
             Does the plotting.
@@ -116,9 +122,27 @@ class Scatter(Plot, object):
                 rotation=90)
 
         # scatter
-        plt.scatter(data[0][1], data[1][1],c=self.marker_style['color'],
-            marker=self.marker_style['marker'], s=self.marker_style['size'],
-            alpha=self.alpha, zorder=5)
+        if self.mode == 'points' and self.dup_tol is not None:
+            # each distinct point drawn once, as opaque as its duplicates
+            # drawn on top of each other would be; one layer per opacity
+            xs, ys, counts = self.remove_dups(data[0][1], data[1][1])
+            alphas = np.round((1 - (1 - self.alpha) ** counts) * 255) / 255
+
+            for alpha in np.unique(alphas):
+                self.layers.append(plt.scatter(xs[alphas == alpha], ys[alphas == alpha], c=self.marker_style['color'],
+                    marker=self.marker_style['marker'], s=self.marker_style['size'],
+                    alpha=alpha, zorder=5))
+            points = len(xs)
+        elif self.mode == 'points':
+            self.layers.append(plt.scatter(data[0][1], data[1][1],c=self.marker_style['color'],
+                marker=self.marker_style['marker'], s=self.marker_style['size'],
+                alpha=self.alpha, zorder=5))
+            points = len(data[0][1])
+        else:
+            bins = self.density(data[0][1], data[1][1])
+            if bins:
+                self.layers.append(bins)
+            points = 0  # bins are few
 
         # axes' labels
         if self.x_label:
@@ -155,133 +179,80 @@ class Scatter(Plot, object):
         for i in six.itervalues(ax.spines):
             i.set_linewidth(1)
 
-        plt.savefig(self.save_to, bbox_inches='tight', transparent=self.transparent)
-
-    # def create(self, data):
-    #     """
-    #         Does the plotting.
-    #     """
-
-    #     if len(data[0][1]) != len(data[1][1]):
-    #         raise ScatterException('Number of instances for each competitor must be the same')
-
-    #     # trying to remove duplicated points with the same coordinates
-    #     xs, ys = self.remove_dups(zip(data[0][1], data[1][1]))
-
-    #     step = int((self.x_max - self.x_min) / 10)
-    #     x = np.arange(self.x_min, self.x_max + self.x_min + step, step)
-
-    #     # "good" area
-    #     plt.plot(x, x, color='black', ls=':', lw=1.5, zorder=3)
-    #     plt.plot(x, 0.1 * x, 'g:', lw=1.5, zorder=3)
-    #     plt.plot(x, 10 * x, 'g:', lw=1.5, zorder=3)
-    #     plt.fill_between(x, 0.1 * x, 10 * x, facecolor='green', alpha=0.15,
-    #         zorder=3)
-
-    #     plt.xlim([self.x_min, self.x_max])
-    #     plt.ylim([self.y_min, self.y_max])
-
-    #     # timeout lines
-    #     plt.axvline(self.timeout, linewidth=1, color='red', ls=':',
-    #         label=str(self.timeout), zorder=3)
-    #     plt.axhline(self.timeout, linewidth=1, color='red', ls=':',
-    #         label=str(self.timeout), zorder=3)
-
-    #     if self.tlb_loc == 'after':
-    #         plt.text(2 * self.x_min, self.timeout + self.x_max / 40,
-    #             self.t_label, horizontalalignment='left',
-    #             verticalalignment='bottom', fontsize=self.f_props['size'] * 0.8)
-    #         plt.text(self.timeout + self.x_max / 40, 2 * self.x_min,
-    #             self.t_label, horizontalalignment='left',
-    #             verticalalignment='bottom', fontsize=self.f_props['size'] * 0.8,
-    #             rotation=90)
-    #     else:
-    #         plt.text(2 * self.x_min, self.timeout - self.x_max / 3.5,
-    #             self.t_label, horizontalalignment='left',
-    #             verticalalignment='bottom', fontsize=self.f_props['size'] * 0.8)
-    #         plt.text(self.timeout - self.x_max / 3.5, 2 * self.x_min,
-    #             self.t_label, horizontalalignment='left',
-    #             verticalalignment='bottom', fontsize=self.f_props['size'] * 0.8,
-    #             rotation=90)
-
-    #     # making the scatter plot step by step for each level
-    #     print sum([len(x) for x in xs]), len(data[0][1])
-    #     xx = []
-    #     yy = []
-    #     rgba_c =[]
-    #     rgba_e =[]
-    #     for l in range(len(xs)):
-    #         xx.extend(xs[l])
-    #         yy.extend(ys[l])
-
-    #         # ctuple = (1., 0., 0., 1 - (1.0 - self.alpha) ** (l + 1))
-    #         # rgba_c.extend([ctuple for i in xs[l]])
-
-    #         # etuple = (0., 0., 0., 1 - (1.0 - self.alpha) ** (l + 1))
-    #         # rgba_e.extend([etuple for i in xs[l]])
-
-    #     # plt.scatter(xx, yy, c=rgba_c, marker='o', edgecolor=rgba_e, s=25, zorder=5)
-    #     plt.scatter(xx, yy, c='r', marker='o', alpha=self.alpha, s=25, zorder=5)
-
-    #     # axes' labels
-    #     if self.x_label:
-    #         plt.xlabel(self.x_label)
-    #     else:
-    #         plt.xlabel(data[0][0])
-
-    #     if self.y_label:
-    #         plt.ylabel(self.y_label)
-    #     else:
-    #         plt.ylabel(data[1][0])
-
-    #     # turning the grid on
-    #     if not self.no_grid:
-    #         plt.grid(True, color='black', ls=':', lw=1, zorder=1)
-
-    #     # choosing logarithmic scales
-    #     ax = plt.gca()
-    #     ax.set_xscale('log')
-    #     ax.set_yscale('log')
-
-    #     # setting ticks font properties
-    #     ax.set_xticklabels(ax.get_xticks(), self.f_props)
-    #     ax.set_yticklabels(ax.get_yticks(), self.f_props)
-
-    #     # formatter
-    #     majorFormatter = plt.LogFormatterMathtext(base=10)
-    #     ax.xaxis.set_major_formatter(majorFormatter)
-    #     ax.yaxis.set_major_formatter(majorFormatter)
-
-    #     # setting frame thickness
-    #     for i in six.itervalues(ax.spines):
-    #         i.set_linewidth(1)
-
-    #     plt.savefig(self.save_to, bbox_inches='tight', transparent=self.transparent)
-
-    # def remove_dups(self, data):
-    #     """
-    #         Removes duplicated points.
-    #     """
-
-    #     pset = set([])
-    #     pdup = {}
-    #     distance = lambda p,q: ((p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2) ** 0.5
-
-    #     for p in data:
-    #         for q in pset:
-    #             if distance(p, q) == 0:
-    #                 pdup[q] += 1
-    #                 break
-    #         else:
-    #             pdup[p] = 1
-    #             pset.add(p)
-
-    #     maxdups = max(six.itervalues(pdup))
-    #     xs = [[] for i in range(maxdups)]
-    #     ys = [[] for i in range(maxdups)]
-
-    #     for p, l in six.iteritems(pdup):
-    #         xs[l - 1].append(p[0])
-    #         ys[l - 1].append(p[1])
-
-    #     return xs, ys
+        if self.mode != 'points' and bins:
+            plt.colorbar(bins, ax=ax, pad=0.02).set_label('instances')
+
+        self.save(points)
+
+    def density(self, xs, ys):
+        """
+            Draws the instances as a density instead of one marker each.
+            Instances solved by both tools are binned on the log-log grid
+            (hexagonal or square bins), with the number of instances of a
+            bin in a logarithmic color scale. Timeouts of either tool or of
+            both are only counted, and the counts are shown at the edges of
+            the plot. Drawing thus takes time in the number of bins rather
+            than of instances. Returns the artist of the bins (None if no
+            instance is solved by both).
+        """
+
+        xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        x_out, y_out = xs >= self.timeout, ys >= self.timeout
+        inside = ~(x_out | y_out)
+
+        # edge counters
+        ax = plt.gca()
+        for count, label, x, y, rot in ((np.sum(x_out & ~y_out), 'timeouts', 0.98, 0.5, 90),
+                (np.sum(y_out & ~x_out), 'timeouts', 0.5, 0.98, 0),
+                (np.sum(x_out & y_out), 'both', 0.98, 0.98, 0)):
+            if count:
+                plt.text(x, y, '{0}: {1:,}'.format(label, count), transform=ax.transAxes, rotation=rot,
+                    horizontalalignment='right' if x > 0.5 else 'center',
+                    verticalalignment='top' if y > 0.5 else 'center',
+                    fontsize=self.f_props['size'] * 0.8, zorder=6,
+                    bbox={'facecolor': 'white', 'edgecolor': 'none', 'alpha': 0.8})
+
+        if not inside.any():
+            return None
+
+        xs, ys = xs[inside], ys[inside]
+        lo = max(self.x_min, min(xs.min(), ys.min()))
+
+        color = self.marker_style['color']
+        cmap = LinearSegmentedColormap.from_list('density', [to_rgba(color, 0.2), to_rgba(color, 1.0)])
+
+        if self.mode == 'hexbin':
+            return plt.hexbin(xs, ys, gridsize=self.bins, xscale='log', yscale='log', mincnt=1,
+                extent=np.log10([lo, self.timeout, lo, self.timeout]), norm=LogNorm(),
+                cmap=cmap, linewidths=0, zorder=2)
+
+        edges = np.geomspace(lo, self.timeout, self.bins + 1)
+        counts = np.histogram2d(xs, ys, bins=[edges, edges])[0]
+
+        return plt.pcolormesh(edges, edges, np.ma.masked_equal(counts.T, 0), norm=LogNorm(),
+            cmap=cmap, zorder=2)
+
+    def remove_dups(self, xs, ys):
+        """
+            Merges duplicated points. With a zero tolerance, only points
+            with the same coordinates are merged. Otherwise, the log-log
+            plane is split into square cells of dup_tol decades, and all
+            the points of a cell are merged into one, placed at their
+            (geometric) mean. Returns the coordinates of the distinct
+            points and their multiplicities.
+        """
+
+        pts = np.column_stack((np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)))
+
+        if not self.dup_tol:
+            pts, counts = np.unique(pts, axis=0, return_counts=True)
+            return pts[:, 0], pts[:, 1], counts
+
+        logs = np.log10(np.maximum(pts, np.finfo(np.float64).tiny))
+        cells, ids, counts = np.unique(np.floor(logs / self.dup_tol), axis=0, return_inverse=True, return_counts=True)
+
+        means = np.zeros((len(cells), 2))
+        np.add.at(means, ids.ravel(), logs)
+        means = 10 ** (means / counts[:, None])
+
+        return means[:, 0], means[:, 1], counts
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## server.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+import collections
+import contextlib
+import io
+import json
+import load
+import multiprocessing
+import os
+import renderer
+import signal
+from six.moves import BaseHTTPServer, queue, socketserver
+import sys
+import threading
+
+
+#
+#==============================================================================
+class RenderServer(object):
+    """
+        Long-running plotting server. Requests have the command-line
+        arguments of mkplot.py and are answered with the names of the files
+        made (and what a dry run shows):
+
+            POST /plot   {"args": ["-b", "png", "--save-to", "x", "a.json"]}
+            GET /status
+
+        Requests wait in a bounded queue and are handled by a fixed number
+        of worker threads. Loading and processing the data is done by one
+        thread at a time (the instance table of statutil is shared), while
+        figures are drawn by a pool of as many processes, which keep
+        matplotlib imported. The datasets read last are kept in an LRU
+        cache, each file being identified by its path, size and mtime.
+
+        Note that the names of all the instances ever loaded stay in the
+        instance table of statutil for the lifetime of the server.
+    """
+
+    def __init__(self, parse, render, workers=1, queue_size=16, datasets=8):
+        """
+            Constructor. parse(args) returns the options and input files of
+            a request and render(data, options, pool) makes its figures (see
+            mkplot.py).
+        """
+
+        self.parse = parse
+        self.render = render
+
+        self.jobs = queue.Queue(queue_size)
+        self.datasets = collections.OrderedDict()
+        self.max_datasets = datasets
+
+        workers = workers or multiprocessing.cpu_count()
+
+        self.lock = threading.Lock()
+        self.pool = renderer.RenderPool(workers)
+
+        for i in range(workers):
+            thread = threading.Thread(target=self.work)
+            thread.daemon = True
+            thread.start()
+
+    def serve(self, host, port):
+        """
+            Serves HTTP requests until interrupted or terminated.
+        """
+
+        httpd = _HTTPServer((host, port), _Handler)
+        httpd.app = self
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        sys.stderr.write('serving on http://{0}:{1}/\n'.format(host, httpd.server_address[1]))
+
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            httpd.server_close()
+            self.pool.close()
+
+    def request(self, args):
+        """
+            Queues a request and waits for its (code, reply) result.
+        """
+
+        job = {'args': args, 'done': threading.Event()}
+
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            return 503, {'error': 'too many queued requests'}
+
+        job['done'].wait()
+        return job['result']
+
+    def work(self):
+        """
+            Worker thread.
+        """
+
+        while True:
+            job = self.jobs.get()
+
+            try:
+                job['result'] = self.run(job['args'])
+            except Exception as e:
+                job['result'] = 500, {'error': '{0}: {1}'.format(type(e).__name__, e)}
+
+            job['done'].set()
+
+    def run(self, args):
+        """
+            Handles a request.
+        """
+
+        out = io.StringIO()
+
+        with self.lock, contextlib.redirect_stdout(out):
+            try:
+                options, files = self.parse(args)
+            except SystemExit:
+                return 400, {'error': 'bad options', 'output': out.getvalue()}
+
+            if options['batch'] or options['serve'] or not files:
+                return 400, {'error': 'input files are expected'}
+
+            raw = self.dataset(files, options)
+            data = load.process_data(raw, options, copy=True)
+            made, tasks = self.render(data, options, None if options['dry_run'] else self.pool)
+
+        self.pool.wait(tasks)
+        return 200, {'files': made, 'output': out.getvalue()}
+
+    def dataset(self, files, options):
+        """
+            Returns the data read from files, reading them unless cached.
+            All the files are read (whatever --only is) without streaming,
+            so that the data can serve any request.
+        """
+
+        ident = (tuple((f, os.path.getsize(f), os.path.getmtime(f)) for f in files),
+                json.dumps(options['legend']), options['csv_delim'])
+
+        if ident in self.datasets:
+            raw = self.datasets.pop(ident)
+        else:
+            raw = load.read_data(files, dict(options, only=None, stream=False))
+
+        self.datasets[ident] = raw
+        while len(self.datasets) > self.max_datasets:
+            self.datasets.popitem(last=False)
+
+        return raw
+
+
+#
+#==============================================================================
+class _HTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+#
+#==============================================================================
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+        HTTP requests of RenderServer.
+    """
+
+    def do_GET(self):
+        if self.path != '/status':
+            return self.reply(404, {'error': 'unknown path'})
+
+        app = self.server.app
+        self.reply(200, {'queued': app.jobs.qsize(), 'datasets': len(app.datasets)})
+
+    def do_POST(self):
+        if self.path != '/plot':
+            return self.reply(404, {'error': 'unknown path'})
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+            args = [str(arg) for arg in body['args']]
+        except (ValueError, KeyError, TypeError):
+            return self.reply(400, {'error': 'expecting {"args": [...]}'})
+
+        self.reply(*self.server.app.request(args))
+
+    def reply(self, code, res):
+        body = json.dumps(res).encode('utf-8')
+
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
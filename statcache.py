@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## statcache.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+import hashlib
+import json
+import mmap
+import numpy as np
+import os
+import records
+import struct
+import sys
+import tempfile
+
+
+#
+#==============================================================================
+class StatCache(object):
+    """
+        On-disk cache of parsed STAT files.
+
+        Each entry is a binary file starting with a fixed-size prefix (magic,
+        size, mtime and SHA-1 of the source file, length of the header)
+        followed by a JSON header (preamble and column layout) and the data
+        blocks: instance names, status mask and the arrays of each column of
+        the RecordStore, written as they are. Arrays are read back through
+        mmap without any conversion. An entry is used if the source file has
+        the same size and either the same mtime or the same SHA-1. The total
+        size of a cache directory is bounded; least recently used entries
+        are removed first.
+    """
+
+    magic = b'MKPLOTC2'
+    prefix = struct.Struct('<8sQdQ20s')
+
+    def __init__(self, path, max_size=1024):
+        """
+            Constructor. If path is 'local', a .mkplot-cache directory next
+            to each input file is used. Size limit is given in MiB.
+        """
+
+        self.path = path
+        self.max_size = max_size * 1024 * 1024
+
+        # entries get the mode of files made by open(), unlike mkstemp()
+        # ones (0600); the umask can only be read by setting it
+        umask = os.umask(0)
+        os.umask(umask)
+        self.mode = 0o666 & ~umask
+
+    def entry(self, filename, keys):
+        """
+            Path to the entry for a file read with the given keys.
+        """
+
+        if self.path == 'local':
+            dirname = os.path.join(os.path.dirname(os.path.abspath(filename)), '.mkplot-cache')
+        else:
+            dirname = self.path
+
+        ident = '{0}\0{1}'.format(os.path.abspath(filename), ','.join(sorted(keys)) if keys else '*')
+        return os.path.join(dirname, hashlib.sha1(ident.encode('utf-8')).hexdigest() + '.bin')
+
+    def load(self, filename, keys=None):
+        """
+            Returns the cached (preamble, names, store) triple or None if
+            there is no valid entry.
+        """
+
+        entry = self.entry(filename, keys)
+
+        try:
+            src = os.stat(filename)
+            with open(entry, 'rb') as fp:
+                magic, size, mtime, hlen, sha1 = self.prefix.unpack(fp.read(self.prefix.size))
+                if magic != self.magic or size != src.st_size:
+                    return None
+
+                if mtime != src.st_mtime:
+                    # touched but possibly unchanged file
+                    if sha1 != file_sha1(filename):
+                        return None
+
+                    self.touch(entry, src.st_mtime)
+
+                header = json.loads(fp.read(hlen).decode('utf-8'))
+                mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError, struct.error):
+            return None
+
+        try:
+            names, store = self.decode(mm, header)
+        except (KeyError, IndexError, TypeError, ValueError):
+            mm.close()
+            return None
+
+        # marking the entry as recently used
+        try:
+            os.utime(entry, None)
+        except OSError:
+            pass
+
+        return header['preamble'], names, store
+
+    def decode(self, mm, header):
+        """
+            Rebuilds the instance names and the record store from the data
+            blocks. Arrays are read-only views of the mapped file (the
+            store never modifies its arrays in place).
+        """
+
+        count = header['count']
+        text = lambda b: mm[b['offset']:b['offset'] + b['nbytes']].decode('utf-8')
+        array = lambda b, dtype, n=count: np.frombuffer(mm, dtype=dtype, count=n, offset=b['offset'])
+
+        names = text(header['names']).split('\0') if count else []
+
+        store = records.RecordStore(count)
+        store.status = array(header['status'], bool)
+        store.orders = [tuple(keys) for keys in header['orders']]
+        store.order = array(header['order'], np.intp)
+
+        for col in header['columns']:
+            kind = col['kind']
+            if kind == 'num':
+                ints = col['ints'] if type(col['ints']) is bool else array(col['ints'], bool)
+                store.cols[col['key']] = {'kind': kind, 'vals': array(col['vals'], np.float64), 'ints': ints}
+            elif kind == 'bool':
+                store.cols[col['key']] = {'kind': kind, 'vals': array(col['vals'], bool), 'present': array(col['present'], bool)}
+            else:
+                store.cols[col['key']] = {'kind': kind, 'text': text(col['text']),
+                        'offsets': array(col['offsets'], np.int64, count + 1), 'present': array(col['present'], bool)}
+                if 'num' in col:
+                    store.cols[col['key']]['num'] = array(col['num'], np.float64)
+            store.keys.append(col['key'])
+
+        return names, store
+
+    def store(self, filename, keys, preamble, names, store):
+        """
+            Stores the preamble, instance names and records of a parsed
+            file. The columns of the store are written as they are.
+        """
+
+        entry = self.entry(filename, keys)
+
+        try:
+            src = os.stat(filename)
+            sha1 = file_sha1(filename)
+            if not os.path.isdir(os.path.dirname(entry)):
+                os.makedirs(os.path.dirname(entry))
+        except (IOError, OSError):
+            return
+
+        blocks = []
+        header = {'preamble': preamble, 'count': len(names), 'columns': []}
+
+        def add(block):
+            blocks.append(block)
+            return len(blocks) - 1
+
+        header['names'] = add('\0'.join(names).encode('utf-8'))
+        header['status'] = add(np.asarray(store.status, dtype=bool).tobytes())
+        header['orders'] = [list(keys) for keys in store.orders]
+        header['order'] = add(np.asarray(store.order, dtype=np.intp).tobytes())
+
+        for key in store.keys:
+            col = store.cols[key]
+            desc = {'key': key, 'kind': col['kind']}
+
+            if col['kind'] == 'num':
+                desc['vals'] = add(col['vals'].tobytes())
+                desc['ints'] = col['ints'] if type(col['ints']) is bool else add(col['ints'].tobytes())
+            elif col['kind'] == 'bool':
+                desc['vals'] = add(col['vals'].tobytes())
+                desc['present'] = add(col['present'].tobytes())
+            else:
+                desc['text'] = add(col['text'].encode('utf-8'))
+                desc['offsets'] = add(col['offsets'].tobytes())
+                desc['present'] = add(col['present'].tobytes())
+                if 'num' in col:
+                    desc['num'] = add(col['num'].tobytes())
+
+            header['columns'].append(desc)
+
+        # computing offsets of the (8-byte aligned) blocks; the blocks
+        # start right after the header, whose length depends on them
+        spans, offset = [], 0
+        for b in blocks:
+            spans.append({'offset': offset, 'nbytes': len(b)})
+            offset += (len(b) + 7) // 8 * 8
+
+        base, hdata = 0, b''
+        while base < self.prefix.size + len(hdata):
+            base = (self.prefix.size + len(hdata) + 7) // 8 * 8
+            hdata = json.dumps(self.layout(header, spans, base)).encode('utf-8')
+        hdata += b' ' * (base - self.prefix.size - len(hdata))
+
+        try:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(entry), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(self.prefix.pack(self.magic, src.st_size, src.st_mtime, len(hdata), sha1))
+                fp.write(hdata)
+                for b in blocks:
+                    fp.write(b)
+                    fp.write(b'\0' * ((8 - len(b) % 8) % 8))
+            os.chmod(tmp, self.mode)
+            os.rename(tmp, entry)
+        except (IOError, OSError) as e:
+            sys.stderr.write('\033[33;1mWarning:\033[m unable to cache \'{0}\': {1}\n'.format(filename, e))
+            return
+
+        self.evict(os.path.dirname(entry))
+
+    def layout(self, header, spans, base):
+        """
+            Replaces block numbers in the header by their file positions.
+        """
+
+        pos = lambda i: {'offset': base + spans[i]['offset'], 'nbytes': spans[i]['nbytes']}
+
+        layout = dict(header)
+        layout['names'] = pos(header['names'])
+        layout['status'] = pos(header['status'])
+        layout['order'] = pos(header['order'])
+        layout['columns'] = []
+
+        for col in header['columns']:
+            col = dict(col)
+            for part in ('vals', 'ints', 'present', 'text', 'offsets', 'num'):
+                if part in col and type(col[part]) is not bool:
+                    col[part] = pos(col[part])
+            layout['columns'].append(col)
+
+        return layout
+
+    def touch(self, entry, mtime):
+        """
+            Updates the source mtime recorded in an entry.
+        """
+
+        try:
+            with open(entry, 'r+b') as fp:
+                fp.seek(16)
+                fp.write(struct.pack('<d', mtime))
+        except (IOError, OSError):
+            pass
+
+    def evict(self, dirname):
+        """
+            Removes least recently used entries until the directory fits the
+            size limit.
+        """
+
+        try:
+            entries = []
+            for fn in os.listdir(dirname):
+                if fn.endswith('.bin'):
+                    st = os.stat(os.path.join(dirname, fn))
+                    entries.append((st.st_mtime, st.st_size, fn))
+        except OSError:
+            return
+
+        total = sum(e[1] for e in entries)
+        for mtime, size, fn in sorted(entries):
+            if total <= self.max_size:
+                break
+
+            try:
+                os.remove(os.path.join(dirname, fn))
+                total -= size
+            except OSError:
+                pass
+
+
+#
+#==============================================================================
+def file_sha1(filename):
+    """
+        Computes the SHA-1 digest of a file.
+    """
+
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b''):
+            sha1.update(chunk)
+
+    return sha1.digest()
@@ -11,7 +11,15 @@
 #
 #==============================================================================
 from __future__ import print_function
+import copy
+import fileutil
+import instfilter
+import itertools
 import json
+import multiprocessing
+import numpy as np
+import re
+import records
 import sys
 
 
@@ -21,54 +29,467 @@ class JSONException(Exception):
     pass
 
 
+#
+#==============================================================================
+class JSONStream:
+    """
+        Incremental reader of a JSON document. The document is read in chunks
+        and values are decoded one by one, so that a caller can walk through
+        an object without building it as a whole.
+    """
+
+    ws = re.compile(r'[ \t\n\r]*')
+    delims = frozenset(' \t\n\r,:]}')
+
+    # a key with its colon, and the comma or brace after a value
+    key = re.compile(r'[ \t\n\r]*"([^"\\]*(?:\\.[^"\\]*)*)"[ \t\n\r]*:[ \t\n\r]*')
+    sep = re.compile(r'[ \t\n\r]*([,}])')
+
+    def __init__(self, fp, chunk_size=1 << 20):
+        """
+            Constructor.
+        """
+
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=None):
+        """
+            Drops the consumed part of the buffer and reads the next chunk.
+            Returns False if the end of file is reached.
+        """
+
+        chunk = self.fp.read(size if size else self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+            Skips whitespaces and returns the next character ('' at the end
+            of file).
+        """
+
+        while True:
+            self.pos = self.ws.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def consume(self, char):
+        """
+            Consumes the given character if it comes next.
+        """
+
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, char):
+        """
+            Consumes the given character or raises ValueError.
+        """
+
+        if not self.consume(char):
+            raise ValueError('expected \'{0}\' at offset {1}'.format(char, self.pos))
+
+    def value(self):
+        """
+            Decodes the next value.
+        """
+
+        self.peek()
+        while True:
+            try:
+                val, end = self.decoder.raw_decode(self.buf, self.pos)
+
+                # a number may continue in the next chunk
+                if self.eof or (end < len(self.buf) and self.buf[end] in self.delims):
+                    self.pos = end
+                    return val
+            except ValueError:
+                if self.eof:
+                    raise
+
+            # reading at least as much as we have for long values
+            self.fill(max(self.chunk_size, len(self.buf) - self.pos))
+
+    def items(self):
+        """
+            Iterates over the keys of the next object. The caller has to
+            consume the value of each key before asking for the next one.
+        """
+
+        self.expect('{')
+        if self.consume('}'):
+            return
+
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError('object key expected at offset {0}'.format(self.pos))
+            self.expect(':')
+            yield key
+
+            if not self.consume(','):
+                self.expect('}')
+                return
+
+    def members(self):
+        """
+            Iterates over the (key, value) pairs of the next object. Each
+            pair is matched and decoded at once, as long as the buffer has
+            it as a whole (and the comma or brace after it); otherwise the
+            next chunk is read first.
+        """
+
+        self.expect('{')
+        if self.consume('}'):
+            return
+
+        match_key, match_sep, decode = self.key.match, self.sep.match, self.decoder.raw_decode
+
+        while True:
+            key, sep = match_key(self.buf, self.pos), None
+            if key:
+                try:
+                    val, end = decode(self.buf, key.end())
+                    sep = match_sep(self.buf, end)
+                except ValueError:
+                    pass
+
+            if sep is None:
+                if self.eof:
+                    raise ValueError('object member expected at offset {0}'.format(self.pos))
+
+                self.fill(max(self.chunk_size, len(self.buf) - self.pos))
+                continue
+
+            self.pos = sep.end()
+            key = key.group(1)
+            yield (json.loads('"' + key + '"') if '\\' in key else key), val
+
+            if sep.group(1) == '}':
+                return
+
+
+#
+#==============================================================================
+def load_projected(fp, keys):
+    """
+        Reads a STAT file keeping only the given keys of each instance in
+        'stats'. Instances are decoded one at a time and the other top-level
+        values are loaded as they are.
+    """
+
+    stream = JSONStream(fp)
+    data_full = {}
+
+    for section in stream.items():
+        if section != 'stats':
+            data_full[section] = stream.value()
+            continue
+
+        stats = {}
+        for inst, rec in stream.members():
+            stats[inst] = {key: rec[key] for key in keys if key in rec}
+        data_full[section] = stats
+
+    if stream.peek():
+        raise ValueError('extra data at offset {0}'.format(stream.pos))
+
+    return data_full
+
+
+#
+#==============================================================================
+def read_preamble(filename):
+    """
+        Reads only the preamble of a STAT file. Since the preamble usually
+        comes after the stats, the tail of an uncompressed file is looked
+        at first; otherwise, the file is streamed up to the preamble.
+    """
+
+    if fileutil.compression(filename) is None:
+        preamble = _tail_preamble(filename)
+        if preamble is not None:
+            return preamble
+
+    with fileutil.open_file(filename) as fp:
+        try:
+            stream = JSONStream(fp, chunk_size=1 << 16)
+            for section in stream.items():
+                val = stream.value()
+                if section == 'preamble':
+                    return val
+        except:
+            raise JSONException('Unable to parse \'{0}\'.'.format(filename))
+
+    raise JSONException('No preamble in \'{0}\'.'.format(filename))
+
+
+#
+#==============================================================================
+def _tail_preamble(filename, size=1 << 16):
+    """
+        Looks for the preamble at the end of a file: it has to be the last
+        value of the top-level object. Returns None if it is not found.
+    """
+
+    with open(filename, 'rb') as fp:
+        fp.seek(0, 2)
+        fp.seek(max(0, fp.tell() - size))
+        tail = fp.read().decode('utf-8', 'ignore')
+
+    pos = tail.rfind('"preamble"')
+    if pos < 0:
+        return None
+
+    try:
+        pos = JSONStream.ws.match(tail, pos + len('"preamble"')).end()
+        if tail[pos:pos + 1] != ':':
+            return None
+
+        pos = JSONStream.ws.match(tail, pos + 1).end()
+        preamble, end = json.JSONDecoder().raw_decode(tail, pos)
+    except ValueError:
+        return None
+
+    if tail[end:].strip() != '}' or type(preamble) is not dict:
+        return None
+
+    return preamble
+
+
+#
+#==============================================================================
+def make_label(preamble, legend):
+    """
+        Label of a tool made of the preamble values of the legend keys.
+    """
+
+    if type(legend) is list:
+        label = ' '.join([preamble[k] for k in legend])
+    else:
+        label = preamble[legend]
+
+    return label.strip()
+
+
+#
+#==============================================================================
+def load_stat(filename, keys=None, cache=None):
+    """
+        Reads a file (or takes it from the cache) into its preamble, its
+        sorted instance names and the RecordStore of their records, as done
+        by Stat.read() and by the worker processes of StatArray.read().
+    """
+
+    loaded = cache.load(filename, keys) if cache else None
+
+    if loaded is None:
+        with fileutil.open_file(filename) as fp:
+            #print('reading {0}'.format(filename), file=sys.stderr)
+            try:
+                if keys:
+                    data_full = load_projected(fp, set(keys).union(['status']))
+                else:
+                    data_full = json.load(fp)
+            except:
+                raise JSONException('Unable to parse \'{0}\'.'.format(filename))
+
+        # the records are moved to the compact store
+        names = sorted(data_full['stats'])
+        store = records.RecordStore.from_records(list(map(data_full['stats'].__getitem__, names)))
+        loaded = (data_full['preamble'], names, store)
+        del data_full
+
+        if cache:
+            cache.store(filename, keys, *loaded)
+
+    return loaded
+
+
+#
+#==============================================================================
+class InstTable:
+    """
+        Table of instance names shared by all Stat objects. Each name is
+        stored once and identified by an integer ID; Stat objects, their
+        clusters and columns refer to instances by these IDs. In the join-key
+        mode, each (instance, benchmark) pair gets its own ID as well.
+    """
+
+    def __init__(self):
+        """
+            Constructor.
+        """
+
+        self.names = []
+        self.ids = {}
+        self.pairs = {}
+
+        # IDs in the order of names and the position of each ID there
+        self.order = np.zeros(0, dtype=np.intp)
+        self.ranks = np.zeros(0, dtype=np.intp)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        """
+            Returns the ID of a name, adding the name if it is new.
+        """
+
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+
+        return self.ids[name]
+
+    def intern(self, names):
+        """
+            Returns the array of IDs of several names.
+        """
+
+        for name in names:
+            if name not in self.ids:
+                self.ids[name] = len(self.names)
+                self.names.append(name)
+
+        return np.fromiter(map(self.ids.__getitem__, names), dtype=np.intp, count=len(names))
+
+    def pair(self, ids, benchmark):
+        """
+            Returns the IDs of the instances of a benchmark in the join-key
+            mode. They are named 'instance@benchmark'.
+        """
+
+        res = np.empty(len(ids), dtype=np.intp)
+
+        for k, i in enumerate(ids.tolist()):
+            if (i, benchmark) not in self.pairs:
+                self.pairs[(i, benchmark)] = self.add('{0}@{1}'.format(self.names[i], benchmark))
+            res[k] = self.pairs[(i, benchmark)]
+
+        return res
+
+    def sort(self, ids):
+        """
+            Sorts IDs by name dropping duplicates.
+        """
+
+        return ids[self.argsort(ids)]
+
+    def argsort(self, ids):
+        """
+            Indices sorting IDs by name; of several equal IDs, only the
+            last one is kept. Names are sorted once for all (and again only
+            if new ones were added).
+        """
+
+        if len(self.ranks) < len(self.names):
+            self.order = np.array(sorted(range(len(self.names)), key=self.names.__getitem__), dtype=np.intp)
+            self.ranks = np.empty(len(self.order), dtype=np.intp)
+            self.ranks[self.order] = np.arange(len(self.order))
+
+        ranks = self.ranks[ids]
+        order = np.argsort(ranks, kind='stable')
+        last = np.append(ranks[order][1:] != ranks[order][:-1], True) if len(ids) else np.zeros(0, dtype=bool)
+
+        return order[last]
+
+    def lookup(self, ids):
+        """
+            Names of several IDs.
+        """
+
+        return list(map(self.names.__getitem__, ids.tolist()))
+
+
+instances = InstTable()
+
+
 #
 #==============================================================================
 class Stat:
     """
-        Simple statistical data class.
+        Simple statistical data class. Instance records are kept in a
+        compact RecordStore whose rows follow the sorted instance IDs; data
+        is a read-only mapping view of them.
     """
 
-    def __init__(self, legend=None, filename=None):
+    def __init__(self, legend=None, filename=None, keys=None, cache=None):
         """
             Constructor.
         """
 
+        self.view = records.RecordView(self)
+
         if filename is None:
+            self.ids = np.zeros(0, dtype=np.intp)
             self.insts_own = []
+            self.store = records.RecordStore()
             self.preamble = {}
-            self.data = {}
             self.label = ''
         elif type(filename) is list:
             print( 'in case of several files use "StatArray" class', file=sys.stderr)
         else:
-            self.read(legend, filename)
+            self.read(legend, filename, keys, cache)
+    @property
+    def data(self):
+        return self.view
+
+    def copy(self):
+        """
+            Returns a copy sharing the columns of the record store.
+        """
+
+        stat = Stat()
+        stat._set_rows(self.ids, self.store.copy())
+        stat.preamble = copy.deepcopy(self.preamble)
+        stat.label = self.label
+
+        return stat
+
     def _set_insts_own(self):
-        self.insts_own = sorted(list(set(self.data.keys())))
+        # (re)interning the sorted names, e.g. of an object made elsewhere
+        self.ids = instances.intern(self.insts_own)
+        self.insts_own = instances.lookup(self.ids)
+
+    def _set_rows(self, ids, store):
+        # ids and store rows are to be in the order of names
+        self.ids = ids
+        self.insts_own = instances.lookup(ids)
+        self.store = store
 
-    def read(self, legend, filename=None):
+    def read(self, legend, filename=None, keys=None, cache=None):
         """
-            Reads a file into a Stat object.
+            Reads a file into a Stat object. If a list of keys is given, the
+            file is streamed and only these keys (and 'status') are kept for
+            each instance. A StatCache object can be given to reuse the result
+            of previous runs.
         """
 
         if filename is None:
             print( 'no filename was specified', file=sys.stderr)
             return
 
-        with open(filename, 'r') as fp:
-            #print('reading {0}'.format(filename), file=sys.stderr)
-            try:
-                data_full = json.load(fp)
-            except:
-                raise JSONException('Unable to parse \'{0}\'.'.format(filename))
+        self._set_loaded(legend, filename, load_stat(filename, keys, cache))
 
-            self.data = data_full['stats']
-            self.preamble = data_full['preamble']
-            self.preamble['origin'] = filename
-            if type(legend) is list:
-                self.label = ' '.join([self.preamble[k] for k in legend])
-            else:
-                self.label = self.preamble[legend]
-            self.label = self.label.strip()
+    def _set_loaded(self, legend, filename, loaded):
+        # (preamble, sorted names, store) of a file, e.g. from a worker
+        self.preamble, self.insts_own, self.store = loaded
+        self.preamble['origin'] = filename
+        self.label = make_label(self.preamble, legend)
         self._set_insts_own()
 
     def write(self, to=None):
@@ -76,7 +497,7 @@ class Stat:
             Writes a Stat object to a file.
         """
 
-        to_write = {'preamble': self.preamble, 'stats': self.data}
+        to_write = {'preamble': self.preamble, 'stats': dict(self.data)}
 
         if to is None:
             to = self.preamble['origin']
@@ -107,31 +528,39 @@ class Stat:
                 sign = lambda x: not x
                 key = failure[3:]
 
-            for inst in self.insts_own:
-                if inst in self.data and self.data[inst]['status'] == True:
-                    if sign(key in self.data[inst]):
+            present = self.store.present(key)
+
+            failed = []
+            for i, inst in enumerate(self.insts_own):
+                if self.store.status[i]:
+                    if sign(present[i]):
                         print('updating', inst, file=sys.stderr)
-                        self.data[inst]['status'] = False
+                        failed.append(i)
+
+            self.store.set_values('status', failed, False)
 
         self.write()
 
-    def filterinsts(self,filters=None):
-        def filter_inst(d):
-            def filter_stuff(filter_key, filter_value):
-                if filter_key not in d:
-                    return False
-                if isinstance(filter_value, list):
-                    return (d[filter_key] in filter_value)
-                return d[filter_key] == filter_value
-            for filter_key, filter_val in filters.items():
-                if not filter_stuff(filter_key, filter_val):
-                    return False
-            return True
+    def filterinsts(self, filters=None):
+        """
+            Keeps the instances satisfying the filters (a dictionary or an
+            InstFilter object).
+        """
+
         if filters:
-            self.data = {inst: val for inst,val in self.data.items() if filter_inst(val)}
-            self._set_insts_own()
+            cols = StatColumns(self.ids, [self])
+            keep = np.flatnonzero(filter_mask(filters, cols)[:, 0])
+
+            self._set_rows(self.ids[keep], self.store.take(keep))
 
     def get_data(self, options, min_value, max_value):
+        """
+            Returns the values of the key for each instance (unsolved ones
+            and timeouts get max_value) along with the number of solved
+            instances and the maximal solved value. This is the fallback of
+            StatArray.get_data() for non-numeric keys.
+        """
+
         vals = []
         num_solved = 0
         last_val = -1
@@ -172,6 +601,247 @@ class Stat:
                         print('{0}: {1} = {2}'.format(inst, crit['key'], self.data[inst][crit['key']]))
 
 
+#
+#==============================================================================
+def _read_stat(args):
+    """
+        Loads one file for the worker processes of StatArray.read(). Only
+        the preamble, the names and the store arrays are sent back: the
+        instance IDs are made by the main process.
+    """
+
+    filename, keys, cache = args
+    return load_stat(filename, keys, cache)
+
+
+#
+#==============================================================================
+def filter_mask(filters, cols):
+    """
+        Evaluates filters (compiled if given as a dictionary) over the
+        columnar data.
+    """
+
+    if not isinstance(filters, instfilter.InstFilter):
+        filters = instfilter.InstFilter(filters)
+
+    return filters.mask(cols)
+
+
+#
+#==============================================================================
+class StatColumns:
+    """
+        Columnar representation of the Stat objects of a StatArray. Rows
+        follow a shared sorted index of instances and columns follow the
+        Stat objects. Matrices of values are built per key on demand.
+    """
+
+    def __init__(self, ids, stat_objs):
+        """
+            Constructor. The rows are given by an array of instance IDs.
+        """
+
+        self.set_rows(ids)
+        self.stat_objs = list(stat_objs)
+
+        # has[i, j] means that instance i is in Stat object j
+        self.has = np.zeros((len(ids), len(stat_objs)), dtype=bool)
+        self.status = np.zeros((len(ids), len(stat_objs)), dtype=bool)
+        self.rows = []
+
+        for j, stat_obj in enumerate(stat_objs):
+            rows = self.pos[stat_obj.ids]
+            self.rows.append(rows)
+            self.has[rows, j] = True
+            self.status[rows, j] = stat_obj.store.status
+
+        self.vals = {}
+        self.numeric = {}
+        self.index_vals = {}
+
+        # columns copied row by row from other columns (see add())
+        self.sources = {}
+
+    def set_rows(self, ids):
+        """
+            Sets the instance IDs of the rows.
+        """
+
+        self.ids = ids
+        self.insts = instances.lookup(ids)
+
+        # row of each instance ID (-1 if it has none)
+        self.pos = np.full(len(instances), -1, dtype=np.intp)
+        self.pos[ids] = np.arange(len(ids))
+
+    def values(self, key):
+        """
+            Returns the matrix of values of a key. Missing and non-numeric
+            values are NaN; self.numeric[key] tells if there were no
+            non-numeric values.
+        """
+
+        if key not in self.vals:
+            vals = np.full(self.has.shape, np.nan)
+            numeric = True
+
+            for j, stat_obj in enumerate(self.stat_objs):
+                if j in self.sources:
+                    src = self.sources[j]
+                    vals[:, j] = np.where(src >= 0, vals[np.arange(len(src)), src], np.nan)
+                    continue
+
+                col, num = stat_obj.store.floats(key)
+                numeric = numeric and num
+                vals[self.rows[j], j] = col
+
+            self.vals[key] = vals
+            self.numeric[key] = numeric
+
+        return self.vals[key]
+
+    def codes(self, key):
+        """
+            Returns the matrix of integer codes of the values of a key and
+            the dictionary mapping values to codes (-1 for missing values).
+            Equal values, in the sense of ==, get the same code in all the
+            columns.
+        """
+
+        if key not in self.index_vals:
+            codes = np.full(self.has.shape, -1, dtype=np.intp)
+            index, missing = {}, records.missing
+
+            for j, stat_obj in enumerate(self.stat_objs):
+                if j in self.sources:
+                    src = self.sources[j]
+                    codes[:, j] = np.where(src >= 0, codes[np.arange(len(src)), src], -1)
+                    continue
+
+                col = stat_obj.store.column(key)
+                try:
+                    distinct = set(col)
+                except TypeError:  # lists or dictionaries
+                    col = [v if v is missing else instfilter.hashable(v) for v in col]
+                    distinct = set(col)
+
+                # missing values get -1
+                distinct.discard(missing)
+                for v in distinct:
+                    index.setdefault(v, len(index))
+                codes[self.rows[j], j] = list(map(index.get, col, itertools.repeat(-1, len(col))))
+
+            self.index_vals[key] = (codes, index)
+
+        return self.index_vals[key]
+
+    def add(self, stat_obj, src):
+        """
+            Adds a column for a Stat object whose records are copied from
+            other columns: src[i] is the column instance i comes from (-1
+            if the Stat object does not have the instance).
+        """
+
+        j = self.has.shape[1]
+        rows = np.arange(len(src))
+        take = lambda mat: np.where(src >= 0, mat[rows, src], False)
+
+        self.stat_objs.append(stat_obj)
+        self.rows.append(np.flatnonzero(src >= 0))
+        self.has = np.column_stack((self.has, src >= 0))
+        self.status = np.column_stack((self.status, take(self.status)))
+        self.sources[j] = src
+
+        for key, vals in self.vals.items():
+            self.vals[key] = np.column_stack((vals, np.where(src >= 0, vals[rows, src], np.nan)))
+
+        for key, (codes, index) in self.index_vals.items():
+            self.index_vals[key] = (np.column_stack((codes, np.where(src >= 0, codes[rows, src], -1))), index)
+
+    def truncate(self, count):
+        """
+            Keeps the first count columns.
+        """
+
+        self.stat_objs = self.stat_objs[:count]
+        self.rows = self.rows[:count]
+        self.has = self.has[:, :count]
+        self.status = self.status[:, :count]
+        self.sources = {j: src for j, src in self.sources.items() if j < count}
+
+        for key, vals in self.vals.items():
+            self.vals[key] = vals[:, :count]
+
+        for key, (codes, index) in self.index_vals.items():
+            self.index_vals[key] = (codes[:, :count], index)
+
+    def restrict(self, mask):
+        """
+            Keeps only the cells set in mask (a boolean matrix of the shape
+            of has) and drops the rows left empty. The cached matrices are
+            sliced instead of being rebuilt.
+        """
+
+        keep = mask.any(axis=1)
+        pos = np.cumsum(keep) - 1
+
+        self.set_rows(self.ids[keep])
+        self.has = mask[keep]
+        self.status = self.status[keep] & self.has
+        self.rows = [pos[rows[mask[rows, j]]] for j, rows in enumerate(self.rows)]
+
+        for key, vals in self.vals.items():
+            self.vals[key] = np.where(self.has, vals[keep], np.nan)
+
+        for key, (codes, index) in self.index_vals.items():
+            self.index_vals[key] = (np.where(self.has, codes[keep], -1), index)
+
+        for j, src in self.sources.items():
+            self.sources[j] = np.where(self.has[:, j], src[keep], -1)
+
+    def best(self, key, subsets):
+        """
+            Virtual best solvers of several subsets of columns: a masked
+            min-reduction of the values of the key across each subset. The
+            masked matrix is shared by all the subsets. Returns for each
+            subset the column every instance is taken from (-1 if no column
+            of the subset has the instance).
+        """
+
+        vals = self.values(key)
+        masked = np.where(self.status & ~np.isnan(vals), vals, np.inf)
+        rows = np.arange(len(self.insts))
+
+        winners = []
+        for subset in subsets:
+            subset = np.array(subset, dtype=np.intp)
+            solved = self.status[:, subset]
+            has = self.has[:, subset]
+
+            # the first best alternative is taken; instances solved with
+            # no value go to the first tool that solved them
+            best = masked[:, subset].argmin(axis=1)
+            best = np.where(np.isinf(masked[rows, subset[best]]), solved.argmax(axis=1), best)
+            src = subset[best]
+
+            # all fail; choose any (the first tool having the instance)
+            failed = ~solved.any(axis=1)
+            src[failed] = subset[has[failed].argmax(axis=1)]
+            src[~has.any(axis=1)] = -1
+
+            winners.append(src)
+
+        return winners
+
+    def select(self, tools):
+        """
+            Indices of the columns whose labels are in tools.
+        """
+
+        return [j for j, stat_obj in enumerate(self.stat_objs) if tools == 'all' or stat_obj.label in tools]
+
+
 #
 #==============================================================================
 class StatArray:
@@ -179,19 +849,22 @@ class StatArray:
         Contains statistical data for several files.
     """
 
-    def __init__(self, legend, files=None):
+    def __init__(self, legend, files=None, jobs=1, keys=None, cache=None):
         """
             Constructor.
         """
 
+        self.cols = None
+
         if files is None:
+            self.inst_ids = np.zeros(0, dtype=np.intp)
             self.inst_full = []
             self.stat_objs = []
         elif type(files) is list:
-            self.read(legend, files)
+            self.read(legend, files, jobs, keys, cache)
         else:
             print('in case of just one file use "Stat" class', file=sys.stderr)
-            self.read(legend, [files])
+            self.read(legend, [files], jobs, keys, cache)
 
     def __getitem__(self, key):
         if key < len(self.stat_objs):
@@ -204,25 +877,115 @@ class StatArray:
         for stat_obj in self.stat_objs:
             yield stat_obj
 
-    def read(self, legend, files=None):
+    def read(self, legend, files=None, jobs=1, keys=None, cache=None):
         """
-            Reads several files into a StatArray object.
+            Reads several files into a StatArray object. If jobs is greater
+            than 1, the files are parsed by a pool of worker processes (0
+            means one process per CPU, and there are never more processes
+            than CPUs). The resulting Stat objects follow the
+            order of the given files in either case. The keys and cache are
+            passed to Stat.read().
         """
 
         if files is None:
             print('no files was specified', file=sys.stderr)
             return
 
-        self.stat_objs = []
-        for f in files:
-            self.stat_objs.append(Stat(legend, f))
+        # more processes than CPUs would only compete for them
+        if jobs == 0 or jobs > multiprocessing.cpu_count():
+            jobs = multiprocessing.cpu_count()
+
+        if jobs > 1 and len(files) > 1:
+            pool = multiprocessing.Pool(min(jobs, len(files)))
+            try:
+                # map() keeps the order of files; an exception raised by
+                # a worker (e.g. JSONException) is re-raised here
+                loaded = pool.map(_read_stat, [(f, keys, cache) for f in files])
+            finally:
+                pool.close()
+                pool.join()
+
+            # the Stat objects and their instance IDs are made here
+            self.stat_objs = []
+            for f, part in zip(files, loaded):
+                self.stat_objs.append(Stat())
+                self.stat_objs[-1]._set_loaded(legend, f, part)
+        else:
+            self.stat_objs = []
+            for f in files:
+                self.stat_objs.append(Stat(legend, f, keys, cache))
         self._set_inst_full()
 
     def _set_inst_full(self):
-        inst_set = set()
-        for stat_obj in self.stat_objs:
-            inst_set = inst_set.union(set(stat_obj.insts_own))
-        self.inst_full = sorted(list(inst_set))
+        ids = [stat_obj.ids for stat_obj in self.stat_objs]
+        self.inst_ids = instances.sort(np.concatenate(ids)) if ids else np.zeros(0, dtype=np.intp)
+        self.inst_full = instances.lookup(self.inst_ids)
+        self.cols = None
+
+    def copy(self):
+        """
+            Returns a copy that can be clustered, filtered and extended with
+            VBSes without changing this array.
+        """
+
+        stat_arr = StatArray(None)
+        stat_arr.stat_objs = [stat_obj.copy() for stat_obj in self.stat_objs]
+        stat_arr.inst_ids = self.inst_ids
+        stat_arr.inst_full = self.inst_full
+
+        return stat_arr
+
+    def truncate(self, count):
+        """
+            Keeps the first count Stat objects, e.g. to drop VBSes.
+        """
+
+        self.stat_objs = self.stat_objs[:count]
+        if self.cols is not None:
+            self.cols.truncate(count)
+
+    def columns(self):
+        """
+            Returns the columnar representation of the Stat objects.
+        """
+
+        if self.cols is None:
+            self.cols = StatColumns(self.inst_ids, self.stat_objs)
+
+        return self.cols
+
+    def get_data(self, options, min_value, max_value, sort=False):
+        """
+            Returns the Stat.get_data() tuples for all Stat objects. Numeric
+            values are processed as NumPy arrays taken from the columnar
+            representation; if sort is True, the values are sorted (as
+            needed for cactus plots).
+        """
+
+        cols = self.columns()
+        vals = cols.values(options['key'])
+
+        if not cols.numeric[options['key']]:
+            data = [stat_obj.get_data(options, min_value, max_value) for stat_obj in self.stat_objs]
+            return [(n, sorted(v), s, l) if sort else (n, v, s, l) for n, v, s, l in data]
+
+        data = []
+        for j, stat_obj in enumerate(self.stat_objs):
+            solved = cols.status[cols.rows[j], j]
+            val = vals[cols.rows[j], j]
+
+            # missing values count as max_value
+            val = np.where(np.isnan(val), max_value, val)
+            last_val = max(-1, val[solved].max()) if solved.any() else -1
+
+            val = np.where(val >= float(options['timeout']), max_value, np.maximum(val, min_value))
+            val[~solved] = max_value
+            if sort:
+                val.sort()
+
+            data.append((stat_obj.label, val, np.count_nonzero(solved), last_val))
+
+        return data
 
     def write(self, files=None):
         """
@@ -246,20 +1009,18 @@ class StatArray:
         if type(use_key) is not list:
             use_key = [use_key]
 
-        clusters = {}
+        clusters, members = {}, {}
 
         for stat_obj in self.stat_objs:
-            # updating the Stat object
-            for i, i_old in enumerate(stat_obj.insts_own):
-                i_new = '{0}@{1}'.format(i_old, stat_obj.preamble['benchmark'])
-                stat_obj.insts_own[i] = i_new
-                stat_obj.data[i_new] = stat_obj.data.pop(i_old)
+            # updating the Stat object: instances become instance@benchmark
+            ids = instances.pair(stat_obj.ids, stat_obj.preamble['benchmark'])
+            order = instances.argsort(ids)
+            stat_obj._set_rows(ids[order], stat_obj.store.take(order))
 
             key = ' '.join([stat_obj.preamble[one_key] for one_key in use_key])
+            members.setdefault(key, []).append(stat_obj)
             if key in clusters:
                 # update the cluster
-                clusters[key].insts_own.extend(stat_obj.insts_own)
-                clusters[key].data.update(stat_obj.data)
 
                 clusters[key].preamble['benchmark'].append(stat_obj.preamble['benchmark'])
                 clusters[key].preamble['program'].append(stat_obj.preamble['program'])
@@ -269,6 +1030,13 @@ class StatArray:
                 clusters[key].preamble['benchmark'] = [clusters[key].preamble['benchmark']]
                 clusters[key].preamble['program'] = [clusters[key].preamble['program']]
 
+        # merging the records of each cluster at once (later files win)
+        for key, objs in members.items():
+            if len(objs) > 1:
+                ids = np.concatenate([obj.ids for obj in objs])
+                order = instances.argsort(ids)
+                clusters[key]._set_rows(ids[order], records.RecordStore.concat([obj.store for obj in objs]).take(order))
+
         self.stat_objs = [cl for cl in clusters.values()]
         self._set_inst_full()
 
@@ -279,87 +1047,138 @@ class StatArray:
 
         print('unclaster() method is not implemented yet', file=sys.stderr)
 
-    def filterinsts(self,filters=None):
+    def filterinsts(self, filters=None):
         """
-            Filters instances from all stat_objs based on the filters parameter.
+            Filters instances from all stat_objs based on the filters
+            parameter (a dictionary or an InstFilter object). The filter is
+            evaluated once over the columnar data of all the objects.
         """
-        for stat_obj in self.stat_objs:
-            stat_obj.filterinsts(filters)
-        self._set_inst_full()
+
+        if filters:
+            cols = self.columns()
+            mask = filter_mask(filters, cols)
+
+            for j, stat_obj in enumerate(self.stat_objs):
+                keep = np.flatnonzero(mask[cols.rows[j], j])
+                stat_obj._set_rows(stat_obj.ids[keep], stat_obj.store.take(keep))
+
+            # the columns stay valid for the remaining instances
+            cols.restrict(mask)
+            self.inst_ids, self.inst_full = cols.ids, cols.insts
 
     def make_vbs(self, vbs_name, tools, key):
         """
             Makes vbs with label vbs_name from tools using the status to filter, and key as the measurement.
         """
-        vbs_stat_objs = self.stat_objs if tools == 'all' else [stat_obj for stat_obj in self.stat_objs if stat_obj.label in tools]
-
-        vbs = Stat()
-        vbs.label = vbs_name
-
-        # Not sure if this part is used...
-        vbs.preamble = vbs_stat_objs[0].preamble
-        vbs.preamble['program'] = 'best of ' + ','.join(tools)
-        vbs.preamble['prog_args'] = ''
-        vbs.preamble['origin'] = [obj.preamble['origin'] for obj in vbs_stat_objs]
-
-        inst_set = set()
-        for stat_obj in vbs_stat_objs:
-            inst_set = inst_set.union(set(stat_obj.insts_own))
-        vbs.insts_own = sorted(list(inst_set))
-
-        for inst in vbs.insts_own:
-            alts = []
-            for stat_obj in vbs_stat_objs:
-                if inst in stat_obj.data and stat_obj.data[inst]['status'] == True:
-                    alts.append(stat_obj.data[inst])
-            if alts:
-                vbs.data[inst] = min(alts, key=lambda x: x[key] if key in x else float('inf'))
-            else:
-                # all fail; choose any:
-                vbs.data[inst] = self.stat_objs[0].data[inst]
 
-        self.stat_objs.append(vbs)
-    
+        self.make_vbses([(vbs_name, tools)], key)
+
+    def make_vbses(self, vbses, key):
+        """
+            Makes several VBSes given as (vbs_name, tools) pairs in one pass
+            over the columnar data. Each VBS Stat object gets the list of
+            tools it was made of in 'tools' and, in 'winners', the index of
+            the tool each of its instances comes from.
+        """
+
+        cols = self.columns()
+
+        # tools referring to other VBSes are replaced by their definitions
+        defs, subsets = {}, []
+        for vbs_name, tools in vbses:
+            if tools != 'all' and any(t in defs for t in tools):
+                sub = [defs[t] if t in defs else [t] for t in tools]
+                tools = 'all' if 'all' in sub else sum(sub, [])
+            defs[vbs_name] = tools
+            subsets.append(cols.select(tools))
+
+        for (vbs_name, tools), vbs_cols, src in zip(vbses, subsets, cols.best(key, subsets)):
+            vbs_stat_objs = [self.stat_objs[j] for j in vbs_cols]
+
+            vbs = Stat()
+            vbs.label = vbs_name
+
+            # Not sure if this part is used...
+            vbs.preamble = vbs_stat_objs[0].preamble
+            vbs.preamble['program'] = 'best of ' + ','.join(tools)
+            vbs.preamble['prog_args'] = ''
+            vbs.preamble['origin'] = [obj.preamble['origin'] for obj in vbs_stat_objs]
+
+            # gathering the records of the winners tool by tool
+            rows = np.flatnonzero(src >= 0)
+            parts, where = [], []
+            for j in np.unique(src[rows]).tolist():
+                sel = rows[src[rows] == j]
+                parts.append(self.stat_objs[j].store.take(np.searchsorted(cols.rows[j], sel)))
+                where.append(sel)
+
+            store = records.RecordStore.concat(parts)
+            if parts:
+                store = store.take(np.argsort(np.concatenate(where)))
+            vbs._set_rows(cols.ids[rows], store)
+
+            # which tool won each instance
+            vbs.tools = [self.stat_objs[j].label for j in vbs_cols]
+            won = cols.status[rows, src[rows]]
+            vbs.winners = np.where(won, np.searchsorted(vbs_cols, src[rows]), -1)
+
+            self.stat_objs.append(vbs)
+            cols.add(vbs, src)
+
     def create_ratio(self, ratio_name, tools, key, timeout, max_value, weird_ratio = False):
         """
             Make a ratio stat_obj with label ratio_name, as the ratio tools[0] / tools[1]. 
         """
-        ratio_stat_objs = [stat_obj for stat_obj in self.stat_objs if stat_obj.label in tools]
 
-        ratio = Stat()
-        ratio.label = ratio_name
-        inst_set = set()
-        for stat_obj in ratio_stat_objs:
-            inst_set = inst_set.union(set(stat_obj.insts_own))
-        insts = sorted(list(inst_set))
+        return self.create_ratios([(ratio_name, tools)], key, timeout, max_value, weird_ratio)[0]
 
-        def get_inst_val(inst, stat_obj):
-            if inst in stat_obj.data and stat_obj.data[inst]['status'] == True and stat_obj.data[inst][key] < timeout:
-                return stat_obj.data[inst][key]
-            else:
-                return timeout
-        vals = []
-        num_solved = 0
-        last_val = float('-inf') if weird_ratio else -1
-        for inst in insts:
-            a = get_inst_val(inst, ratio_stat_objs[0])
-            b = get_inst_val(inst, ratio_stat_objs[1])
-            if a < timeout and b < timeout:
-                val = (a / b - 1 if a >= b else 1 - b / a) if weird_ratio else a / b
-                vals.append(val)
-                #if val < 1:
-                #    print(ratio_stat_objs[0].data[inst]['cegar-iterations'])
-                if last_val < val:
-                    last_val = val
-            elif a < timeout:
-                vals.append(float('-inf') if weird_ratio else 0)
-            elif b < timeout:
-                vals.append(max_value)
+    def create_ratios(self, ratios, key, timeout, max_value, weird_ratio = False):
+        """
+            Computes several ratios given as (ratio_name, tools) pairs. The
+            values of all the tools are aligned and capped by the timeout in
+            one pass; each ratio is then computed over whole arrays.
+        """
+
+        cols = self.columns()
+
+        # unsolved values become the timeout
+        vals = cols.values(key)
+        vals = np.where(cols.status & (vals < timeout), vals, timeout)
+
+        data = []
+        for ratio_name, tools in ratios:
+            ra, rb = cols.select(tools)[:2]
+
+            # instances of either tool; dropping those both tools fail on
+            rows = cols.has[:, ra] | cols.has[:, rb]
+            a, b = vals[rows, ra], vals[rows, rb]
+            sa, sb = a < timeout, b < timeout
+            keep = sa | sb
+            a, b, sa, sb = a[keep], b[keep], sa[keep], sb[keep]
+            both = sa & sb
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if weird_ratio:
+                    ratio = np.where(a >= b, a / b - 1, 1 - b / a)
+                else:
+                    ratio = a / b
+
+            res = np.where(both, ratio, max_value)
+            res[sa & ~sb] = float('-inf') if weird_ratio else 0
+
+            # last_val is reset to max_value by an instance solved only by
+            # tools[1] and then grows with the ratios that follow it
+            last_val = float('-inf') if weird_ratio else -1
+            only_b = np.flatnonzero(sb & ~sa)
+            if len(only_b):
                 last_val = max_value
-            else:
-                continue
-            num_solved += 1
-        return (ratio_name, vals, num_solved, last_val)
+                both[:only_b[-1]] = False
+            if both.any():
+                last_val = max(last_val, res[both].max())
+
+            data.append((ratio_name, res, len(res), last_val))
+
+        return data
 
     def compare(self, cmp_key=None):
         """
@@ -367,7 +1186,18 @@ class StatArray:
         """
 
         if cmp_key:
-            for inst in self.inst_full:
+            cols = self.columns()
+            vals = cols.values(cmp_key)
+
+            if cols.numeric[cmp_key]:
+                # only instances having different numeric values are checked
+                mask = cols.status & ~np.isnan(vals)
+                diff = np.where(mask, vals, np.inf).min(axis=1) < np.where(mask, vals, -np.inf).max(axis=1)
+                rows = np.flatnonzero(diff)
+            else:
+                rows = np.flatnonzero((cols.status & cols.has).sum(axis=1) > 1)
+
+            for inst in [self.inst_full[i] for i in rows]:
                 vals = {}
 
                 for stat_obj in self.stat_objs:
@@ -394,25 +1224,23 @@ class StatArray:
                     print(inst)
 
             else:
-                status = False if to_list == 'failed' else True
+                cols = self.columns()
+                mask = cols.has & (cols.status if to_list != 'failed' else ~cols.status)
 
-                for inst in self.inst_full:
-                    objs = []
-
-                    for stat_obj in self.stat_objs:
-                        if inst in stat_obj.data and stat_obj.data[inst]['status'] == status:
-                            p = stat_obj.preamble
-                            if 'prog_alias' in p:
-                                objs.append(p['prog_alias'])
-                            else:
-                                objs.append(p['program'] + ' ' + p['prog_args'])
-
-                    if objs:
-                        if len(self.stat_objs) > 1:
-                            objs = '[{0}]'.format(', '.join(obj for obj in objs))
-                            print('{0}: {1}'.format(inst, objs))
-                        else:
-                            print(inst)
+                names = []
+                for stat_obj in self.stat_objs:
+                    p = stat_obj.preamble
+                    if 'prog_alias' in p:
+                        names.append(p['prog_alias'])
+                    else:
+                        names.append(p['program'] + ' ' + p['prog_args'])
+
+                for i in np.flatnonzero(mask.any(axis=1)):
+                    if len(self.stat_objs) > 1:
+                        objs = '[{0}]'.format(', '.join(names[j] for j in np.flatnonzero(mask[i])))
+                        print('{0}: {1}'.format(self.inst_full[i], objs))
+                    else:
+                        print(self.inst_full[i])
 
     def list(self, crit=None):
         """
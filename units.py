@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+#-*- coding:utf-8 -*-
+##
+## units.py
+##
+##  Created on: Oct 18, 2026
+##
+
+#
+#==============================================================================
+import numpy as np
+import re
+
+
+#
+#==============================================================================
+# unit suffixes: quantity and factor to the normalized unit (MiB or seconds)
+factors = {
+    'KiB': ('memory', 1.0 / 1024),
+    'MiB': ('memory', 1.0),
+    'GiB': ('memory', 1024.0),
+    's': ('time', 1.0),
+    'ms': ('time', 1e-3)
+}
+
+number = re.compile(r'^[ \t]*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)[ \t]*([A-Za-z]+)[ \t]*$', re.M)
+
+# characters of the same numbers, once their unit is removed
+digits = str.maketrans('', '', '0123456789.+-eE \t\n')
+
+# unit detected for each key, tried first on the next columns of the key
+detected = {}
+
+
+#
+#==============================================================================
+def parse(key, strs):
+    """
+        Converts a column of strings like '171864 KiB' or '1.5 s' into a
+        float64 array of values in the normalized unit of their quantity.
+        Returns None unless all the strings are numbers with units of the
+        same quantity.
+
+        The whole column is processed at once. If the key had a single
+        unit so far, the values are only checked to be numbers once it is
+        removed (they may only have number characters and must convert to
+        floats); otherwise the units are detected.
+    """
+
+    if not strs:
+        return None
+
+    # values are matched line by line, so none may span several lines
+    text = '\n'.join(strs)
+    if text.count('\n') != len(strs) - 1:
+        return None
+
+    unit = detected.get(key)
+    if unit:
+        if text.count(unit + '\n') == len(strs) - 1 and text.endswith(unit):
+            nums = text[:-len(unit)].replace(unit + '\n', '\n')
+
+            # e.g. 'ms' values seen with unit 's', or 'nan s'
+            if not nums.translate(digits):
+                try:
+                    return np.array(nums.split('\n'), dtype=np.float64) * factors[unit][1]
+                except ValueError:  # e.g. '1e' or '-'
+                    pass
+
+    # detection, unless the first value is not even a number with a unit
+    if not number.match(strs[0]) or number.match(strs[0]).group(2) not in factors:
+        return None
+
+    found = number.findall(text)
+    if len(found) != len(strs):
+        return None
+
+    nums, suffixes = zip(*found)
+    used = set(suffixes)
+    if not used <= set(factors) or len(set(factors[u][0] for u in used)) > 1:
+        return None
+
+    if len(used) == 1:
+        detected[key] = suffixes[0]
+        scale = factors[suffixes[0]][1]
+    else:
+        detected.pop(key, None)
+        scale = np.array([factors[u][1] for u in suffixes])
+
+    return np.array(nums, dtype=np.float64) * scale